@@ -1,8 +1,15 @@
+import numpy as np
+import pandas as pd
 import streamlit as st
 from src.carbon_footprint.bot.carbon_bot import CarbonFootprintBot
+from src.carbon_footprint.config.settings import STREAMLIT_CHART_OUTPUT
 from src.carbon_footprint.utils.news_fetcher import NewsFetcher
+from src.carbon_footprint.utils.scenario_engine import ScenarioEngine, Substitution
 
-# Initialize the bot
+# Render charts natively in the browser from JSON specs unless PNGs are requested
+CHART_OUTPUT = STREAMLIT_CHART_OUTPUT
+
+# Initialize the bot (PROFILE_ENABLED=true profiles a PROFILE_SAMPLE_RATE share of its requests)
 bot = CarbonFootprintBot()
 
 # App title
@@ -38,6 +45,9 @@ if st.sidebar.button("Calculate Carbon Footprint"):
         st.header("📊 Your Carbon Footprint Results")
         st.metric("Daily Emissions", f"{emissions_data['total']:.2f} kg CO2")
         st.metric("Yearly Emissions", f"{emissions_data['yearly_total']:.2f} kg CO2")
+        if emissions_data['uncertainty']:
+            band = emissions_data['uncertainty']['yearly_total']
+            st.caption(f"90% range: {band['p5']:.0f} - {band['p95']:.0f} kg CO2 per year")
         
         # Show emissions breakdown
         st.subheader("Emissions Breakdown")
@@ -48,14 +58,58 @@ if st.sidebar.button("Calculate Carbon Footprint"):
         
         # Show visualizations
         st.subheader("Visualizations")
-        visualization_paths = bot.get_visualizations(emissions_data)
-        for viz_type, path in visualization_paths.items():
-            st.image(path, caption=viz_type.replace("_", " ").title())
+        visualizations = bot.get_visualizations(emissions_data, output_format=CHART_OUTPUT)
+        for viz_type, chart in visualizations.items():
+            if CHART_OUTPUT == 'json':
+                st.vega_lite_chart(chart, use_container_width=True)
+            else:
+                st.image(chart, caption=viz_type.replace("_", " ").title())
         
         # Show recommendations
         st.subheader("🌱 Recommendations")
+        insights_future = bot.start_ai_insights(user_data, emissions_data)
         recommendations = bot.get_recommendations(emissions_data)
-        st.write(recommendations)
+        st.text(recommendations)
+    
+    with st.spinner("Adding AI insights..."):
+        insights = bot.get_ai_insights(insights_future)
+        if insights:
+            st.write(insights)
+
+# What-if scenarios
+st.header("🔀 What-If Scenarios")
+max_effort = st.slider("How much effort are you willing to put in? (effort points per day)", 0, 50, 15)
+rank_by = st.radio("Rank scenarios by", ["savings", "efficiency"], horizontal=True)
+
+scenario_engine = ScenarioEngine()
+scenario_results = scenario_engine.evaluate(
+    user_data,
+    [
+        Substitution('car_km', 'train_km', np.linspace(0, car_km, 21), effort_per_unit=0.5,
+                     label="Car km moved to train"),
+        Substitution('car_km', 'bus_km', np.linspace(0, car_km, 21), effort_per_unit=0.4,
+                     label="Car km moved to bus"),
+        Substitution('meat_meals', 'vegan_meals', np.arange(meat_meals + 1), effort_per_unit=4,
+                     label="Meat meals made vegan"),
+        Substitution('meat_meals', 'veg_meals', np.arange(meat_meals + 1), effort_per_unit=2,
+                     label="Meat meals made vegetarian"),
+        Substitution('electricity', None, np.linspace(0, electricity * 0.3, 7), effort_per_unit=1,
+                     label="kWh saved")
+    ],
+    max_effort=max_effort,
+    rank_by=rank_by,
+    top_k=5
+)
+st.caption(f"Evaluated {scenario_results['evaluated']:,} combinations, "
+           f"{scenario_results['feasible']:,} within your effort budget")
+if scenario_results['scenarios']:
+    st.dataframe(pd.DataFrame([
+        {**scenario['changes'],
+         'Daily savings (kg CO2)': round(scenario['daily_savings_kg'], 2),
+         'Yearly savings (kg CO2)': round(scenario['yearly_savings_kg']),
+         'Effort': scenario['effort']}
+        for scenario in scenario_results['scenarios']
+    ]))
 
 # Chat interface
 st.header("💬 Chat with the Carbon Assistant")
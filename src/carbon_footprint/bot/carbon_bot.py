@@ -1,28 +1,76 @@
-import openai
-from ..config.settings import EMISSION_FACTORS, OPENAI_API_KEY
+from ..config.settings import (
+    EMISSION_FACTORS, CHART_OUTPUT, API_DEADLINE, PENDING_REQUEST_TTL, PENDING_REQUESTS_MAX,
+    UNCERTAINTY_ENABLED, CHAT_TOKEN_BUDGET, CHAT_RECENT_TOKEN_BUDGET, CHAT_SUMMARY_TOKEN_BUDGET,
+    ANSWER_INDEX_ENABLED
+)
 from ..data.database import Database, DataValidator
+from ..data.grid_intensity import GridIntensityStore
+from ..data.write_queue import get_write_queue
+from ..data.regional_index import get_regional_index
 from ..models.ml_models import EmissionsAnalyzer
-from ..utils.visualizer import EmissionsVisualizer
+from ..utils.visualizer import EmissionsVisualizer, RENDER_LOCK
 from ..utils.insights_engine import AIInsightsEngine
 from ..utils.emissions_api import EmissionsDataAPI
-import pandas as pd
-from typing import Dict, Any
+from ..utils.recommendation_engine import RecommendationEngine
+from ..utils.uncertainty import UncertaintyEstimator
+from ..utils.conversation_memory import ConversationMemory
+from ..utils.answer_index import get_answer_index
+from ..utils.factor_registry import get_factor_registry
+from ..utils.profiler import profiled
+from ..utils.openai_client import (
+    get_openai_scheduler, PRIORITY_INTERACTIVE, PRIORITY_DEFAULT
+)
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+import threading
+import time
+import uuid
+from typing import Dict, Any, Optional
+
+CHAT_SYSTEM_PROMPT = (
+    "You are a knowledgeable and helpful sustainability expert. "
+    "Provide specific, actionable advice about carbon footprint reduction. "
+    "Be conversational and encouraging, but also direct and practical. "
+    "Use emojis occasionally to make the conversation engaging. "
+    "If you don't know something, admit it and suggest alternatives."
+)
 
 class CarbonFootprintBot:
     def __init__(self):
         self.emission_factors = EMISSION_FACTORS
-        self.client = openai.OpenAI(api_key=OPENAI_API_KEY)
+        self.scheduler = get_openai_scheduler()
+        self.insights_engine = AIInsightsEngine()
+        # Background work (chart rendering, LLM enrichment) that callers shouldn't wait on
+        self.executor = ThreadPoolExecutor(max_workers=4)
+        # request_id -> (created, stages), oldest first; bounded by PENDING_REQUESTS_MAX and PENDING_REQUEST_TTL
+        self.pending_requests = OrderedDict()
+        self.pending_lock = threading.Lock()
         self.db = Database()
         self.analyzer = EmissionsAnalyzer()
         self.visualizer = EmissionsVisualizer()
         self.validator = DataValidator()
         self.last_input = {}
         self.db.initialize_database()
+        # Inserts are committed in the background so requests don't wait on SQLite
+        self.write_queue = get_write_queue()
         self.emissions_api = EmissionsDataAPI()
+        self.factor_registry = get_factor_registry()
+        self.grid_store = GridIntensityStore(self.db)
+        self.regional_index = get_regional_index()
+        self.recommendation_engine = RecommendationEngine(self.factor_registry)
+        self.uncertainty = UncertaintyEstimator() if UNCERTAINTY_ENABLED else None
         self.user_location = None
         self.user_region = None
-        self.conversation_history = []
+        self.memory = ConversationMemory(
+            token_budget=CHAT_TOKEN_BUDGET,
+            recent_token_budget=CHAT_RECENT_TOKEN_BUDGET,
+            summary_token_budget=CHAT_SUMMARY_TOKEN_BUDGET
+        )
         self.user_context = {}
+        # Repeat questions are answered from the local index; the LLM only handles misses
+        self.answer_index = get_answer_index() if ANSWER_INDEX_ENABLED else None
+        self.last_llm_exchange = None
+        self.llm_stats = {'llm_calls': 0, 'llm_seconds': 0.0}
 
     def set_user_location(self, latitude: float, longitude: float, region: str):
         """
@@ -31,6 +79,7 @@ class CarbonFootprintBot:
         self.user_location = (latitude, longitude)
         self.user_region = region
 
+    @profiled('process_user_data')
     def process_user_data(self, user_data):
         """
         Process user input data regardless of source (API, terminal, frontend)
@@ -44,8 +93,13 @@ class CarbonFootprintBot:
         # Calculate all emissions
         emissions_breakdown = self.calculate_emissions(valid_data)
         
-        # Save data
-        self.db.save_user_data({**valid_data, 'total_emissions': emissions_breakdown['total']})
+        # Queue the data for saving along with the factor set that produced it
+        self.write_queue.put(self.db.user_data_row({
+            **valid_data,
+            'total_emissions': emissions_breakdown['total'],
+            'factor_version': emissions_breakdown['factor_version'],
+            'region': self.user_region
+        }))
         
         return emissions_breakdown
 
@@ -53,17 +107,22 @@ class CarbonFootprintBot:
         """
         Calculate emissions using real-time data where available
         """
-        # Get real-time grid carbon intensity if location is set
-        if self.user_region:
-            grid_intensity = self.emissions_api.get_grid_carbon_intensity(
-                country_code="US",  # Update based on user's country
-                region=self.user_region
-            )
-        else:
-            grid_intensity = self.emission_factors['electricity']
+        # Get the emissions factors currently in effect for the user's region
+        ipcc_factors, factor_version = self.factor_registry.factors_for(self.user_region)
 
-        # Get latest IPCC emissions factors
-        ipcc_factors = self.emissions_api.get_ipcc_emissions_factors()
+        # Use the locally stored hourly grid intensity if location is set,
+        # only falling back to a real-time request when the series has no recent hour
+        # and to the default factor when the upstream is unavailable
+        grid_intensity = None
+        if self.user_region:
+            grid_intensity = self.grid_store.intensity_at(self.user_region)
+            if grid_intensity is None:
+                grid_intensity = self.emissions_api.get_grid_carbon_intensity(
+                    country_code="US",  # Update based on user's country
+                    region=self.user_region
+                )
+        if grid_intensity is None:
+            grid_intensity = ipcc_factors.get('electricity', self.emission_factors['electricity'])
         
         # Calculate transport emissions using IPCC factors if available
         transport_emissions = (
@@ -92,6 +151,10 @@ class CarbonFootprintBot:
 
         total_emissions = transport_emissions + energy_emissions + diet_emissions
         
+        uncertainty = None
+        if self.uncertainty is not None:
+            uncertainty = self.uncertainty.estimate(valid_data, ipcc_factors, grid_intensity)
+        
         return {
             'transport': transport_emissions,
             'energy': energy_emissions,
@@ -99,38 +162,110 @@ class CarbonFootprintBot:
             'total': total_emissions,
             'yearly_total': total_emissions * 365,
             'air_quality': air_quality,
-            'grid_intensity': grid_intensity
+            'grid_intensity': grid_intensity,
+            'factor_version': factor_version,
+            'uncertainty': uncertainty
         }
 
-    def get_visualizations(self, emissions_data):
+    @profiled('get_visualizations')
+    def get_visualizations(self, emissions_data, output_format=None, valid_data=None, region=None):
         """
-        Generate all visualizations based on emissions data
+        Generate all visualizations based on emissions data.
+        output_format 'png' renders image files and returns their paths;
+        'json' returns Vega-Lite specs for the client to render.
+        valid_data and region default to the bot's last input and region; callers
+        running this off the request thread must pass them.
         """
-        df = pd.read_sql_query("SELECT * FROM user_data", self.db.get_connection())
+        output_format = output_format or CHART_OUTPUT
+        if valid_data is None:
+            valid_data = self.validator.validate_input(self.last_input)
+            region = self.user_region
+        # Make sure this request's own row is in the history
+        self.write_queue.flush()
+        cohort, regional_data = self.get_peer_comparison(valid_data, emissions_data, region)
         
-        visualization_paths = {
-            'breakdown': self.visualizer.create_emissions_breakdown(
-                emissions_data['transport'],
-                emissions_data['energy'],
-                emissions_data['diet']
-            ),
-            'historical': self.visualizer.plot_historical_trends(df),
-            'comparison': self.visualizer.create_comparison_chart(emissions_data['total'])
-        }
+        if output_format == 'json':
+            df = self.db.load_history(['total_emissions'])
+            return {
+                'breakdown': self.visualizer.emissions_breakdown_spec(
+                    emissions_data['transport'],
+                    emissions_data['energy'],
+                    emissions_data['diet']
+                ),
+                'historical': self.visualizer.historical_trends_spec(df),
+                'comparison': self.visualizer.comparison_chart_spec(
+                    emissions_data['total'], regional_data, cohort
+                )
+            }
+        
+        df = self.db.load_history()
+        
+        with RENDER_LOCK:
+            visualization_paths = {
+                'breakdown': self.visualizer.create_emissions_breakdown(
+                    emissions_data['transport'],
+                    emissions_data['energy'],
+                    emissions_data['diet']
+                ),
+                'historical': self.visualizer.plot_historical_trends(df),
+                'comparison': self.visualizer.create_comparison_chart(
+                    emissions_data['total'], regional_data, cohort
+                )
+            }
         
         return visualization_paths
 
-    def get_recommendations(self, emissions_data):
+    def get_peer_comparison(self, valid_data, emissions_data, region=None):
         """
-        Generate AI-powered recommendations based on emissions data
+        Look up the user's peer cohort and the regional and national averages to compare against
         """
-        user_data = {
-            **self.last_input,
-            'total_emissions': emissions_data['total']
-        }
-        
-        insights_engine = AIInsightsEngine()
-        return insights_engine.generate_ai_insights(user_data)
+        cohort = self.analyzer.compare_to_peers(valid_data, emissions_data['total'], region)
+
+        # Prefer the locally indexed EPA averages, then fall back to averages over our own users
+        regional_data = self.regional_index.lookup(region)
+        if regional_data is None and cohort:
+            regional_data = {'national_average': cohort['population_mean']}
+            if cohort['regional_mean'] is not None:
+                regional_data['average_emissions'] = cohort['regional_mean']
+        return cohort, regional_data
+
+    def get_recommendations(self, emissions_data, valid_data=None, region=None):
+        """
+        Return quantified rule-based recommendations immediately.
+        valid_data and region default to the bot's last input and region; callers
+        serving concurrent requests must pass them.
+        """
+        if valid_data is None:
+            valid_data = self.validator.validate_input(self.last_input)
+            region = self.user_region
+        recommendations = self.recommendation_engine.generate(
+            valid_data, region, emissions_data.get('grid_intensity')
+        )
+        return self.recommendation_engine.format(recommendations, emissions_data['total'])
+
+    def start_ai_insights(self, user_data, emissions_data) -> Future:
+        """
+        Start the AI-written analysis in the background and return its future;
+        collect it with get_ai_insights()
+        """
+        return self.executor.submit(
+            self.insights_engine.generate_ai_insights,
+            {**user_data, 'total_emissions': emissions_data['total']}
+        )
+
+    def get_ai_insights(self, future: Optional[Future], timeout: Optional[float] = None) -> Optional[str]:
+        """
+        Wait up to timeout seconds for the AI insights started by start_ai_insights()
+        """
+        if future is None:
+            return None
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            return None
+        except Exception as e:
+            print(f"Error generating AI insights: {e}")
+            return None
 
     def get_terminal_input(self):
         """
@@ -163,6 +298,9 @@ class CarbonFootprintBot:
         print("\n=== Your Carbon Footprint Results ===")
         print(f"Your estimated daily carbon footprint is: {emissions_data['total']:.2f} kg CO2")
         print(f"Yearly estimate: {emissions_data['yearly_total']:.2f} kg CO2")
+        if emissions_data['uncertainty']:
+            band = emissions_data['uncertainty']['total']
+            print(f"90% range: {band['p5']:.2f} - {band['p95']:.2f} kg CO2 per day")
         
         # Generate and show visualizations
         visualization_paths = self.get_visualizations(emissions_data)
@@ -171,26 +309,109 @@ class CarbonFootprintBot:
         print(f"- Historical Trends: Shows how your carbon footprint has changed over time")
         print(f"- Comparison Chart: Compares your carbon footprint to the average person")
         
-        # Get and show recommendations
+        # Get and show recommendations, then the AI analysis once it arrives
+        insights_future = self.start_ai_insights(user_data, emissions_data)
         recommendations = self.get_recommendations(emissions_data)
-        print("\n=== Analyzing Your Carbon Footprint ===")
         print(recommendations)
+        print("\n=== Analyzing Your Carbon Footprint ===")
+        insights = self.get_ai_insights(insights_future)
+        if insights:
+            print(insights)
         
         return emissions_data
 
-    def api_interface(self, user_data):
+    def api_interface(self, user_data, concurrent=False, deadline=None, output_format=None):
         """
-        Handle API requests
+        Handle API requests.
+        With concurrent=True, charts and AI insights run in parallel once emissions are
+        known, bounded by an overall deadline in seconds. Stages still running at the
+        deadline are listed under 'pending'; fetch them later with collect_pending().
         """
+        if not concurrent:
+            emissions_data = self.process_user_data(user_data)
+            valid_data = self.validator.validate_input(user_data)
+            visualization_paths = self.get_visualizations(emissions_data, output_format, valid_data, self.user_region)
+            recommendations = self.get_recommendations(emissions_data, valid_data, self.user_region)
+            
+            return {
+                'emissions': emissions_data,
+                'visualizations': visualization_paths,
+                'recommendations': recommendations
+            }
+        
+        deadline = API_DEADLINE if deadline is None else deadline
+        started = time.monotonic()
         emissions_data = self.process_user_data(user_data)
-        visualization_paths = self.get_visualizations(emissions_data)
-        recommendations = self.get_recommendations(emissions_data)
         
-        return {
+        # Rule-based recommendations take milliseconds, so only charts and the LLM run in the pool.
+        # Everything gets this request's input explicitly; last_input may belong to another request.
+        valid_data = self.validator.validate_input(user_data)
+        region = self.user_region
+        recommendations = self.get_recommendations(emissions_data, valid_data, region)
+        stages = {
+            'visualizations': self.executor.submit(
+                self.get_visualizations, emissions_data, output_format, valid_data, region
+            ),
+            'ai_insights': self.start_ai_insights(user_data, emissions_data)
+        }
+        wait(stages.values(), timeout=max(0.0, deadline - (time.monotonic() - started)))
+        
+        request_id = uuid.uuid4().hex
+        result = {
+            'request_id': request_id,
             'emissions': emissions_data,
-            'visualizations': visualization_paths,
-            'recommendations': recommendations
+            'recommendations': recommendations,
+            **self._stage_results(stages)
         }
+        if result['pending']:
+            self._keep_pending(request_id, {name: stages[name] for name in result['pending']})
+        return result
+
+    def _keep_pending(self, request_id, stages):
+        """
+        Hold unfinished stages for collect_pending(), dropping expired and excess requests oldest first
+        """
+        now = time.monotonic()
+        with self.pending_lock:
+            self.pending_requests[request_id] = (now, stages)
+            while self.pending_requests:
+                oldest_id, (created, oldest) = next(iter(self.pending_requests.items()))
+                if now - created <= PENDING_REQUEST_TTL and len(self.pending_requests) <= PENDING_REQUESTS_MAX:
+                    break
+                del self.pending_requests[oldest_id]
+                for future in oldest.values():
+                    future.cancel()
+
+    def _stage_results(self, stages):
+        results = {'pending': []}
+        for name, future in stages.items():
+            if not future.done():
+                results[name] = None
+                results['pending'].append(name)
+                continue
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                print(f"Error generating {name}: {e}")
+                results[name] = None
+        return results
+
+    def collect_pending(self, request_id: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Wait up to timeout seconds for the pending stages of a concurrent api_interface call
+        """
+        with self.pending_lock:
+            entry = self.pending_requests.get(request_id)
+        if entry is None or time.monotonic() - entry[0] > PENDING_REQUEST_TTL:
+            return {'pending': []}
+        
+        stages = entry[1]
+        wait(stages.values(), timeout=timeout)
+        results = self._stage_results(stages)
+        if not results['pending']:
+            with self.pending_lock:
+                self.pending_requests.pop(request_id, None)
+        return results
 
     def get_predictive_insights(self, emissions_data: dict) -> str:
         """
@@ -221,7 +442,8 @@ class CarbonFootprintBot:
             """
 
             # Call OpenAI API
-            response = self.client.chat.completions.create(
+            response = self.scheduler.chat_completion(
+                priority=PRIORITY_DEFAULT,
                 model="gpt-3.5-turbo",
                 messages=[
                     {
@@ -247,13 +469,27 @@ class CarbonFootprintBot:
         print("Welcome to Carbon Footprint Assistant! 👋")
         print("I can help you understand and reduce your carbon footprint.")
         print("Type 'exit' to end the conversation or 'calculate' to measure your footprint.")
+        if self.answer_index is not None:
+            print("Type 'approve' to save my last answer for reuse.")
         
         while True:
             user_input = input("\nYou: ").strip()
             
             if user_input.lower() == 'exit':
+                stats = self.get_chat_stats()
+                if stats.get('answer_lookups'):
+                    print(f"\nAnswered {stats['answer_hits']} of {stats['answer_lookups']} questions locally "
+                          f"({stats['answer_hit_rate']:.0%}, {stats['answer_lookup_ms']:.1f} ms each); "
+                          f"{stats['llm_calls']} LLM calls averaged {stats['llm_latency_ms']:.0f} ms")
                 print("\nGoodbye! Keep making sustainable choices! 🌱")
                 break
+            
+            if user_input.lower() == 'approve':
+                if self.approve_last_answer():
+                    print("\nSaved. I'll answer that question instantly next time.")
+                else:
+                    print("\nThere's no new answer to approve yet.")
+                continue
                 
             if user_input.lower() == 'calculate':       
                 emissions_data = self.terminal_interface()
@@ -263,59 +499,77 @@ class CarbonFootprintBot:
             response = self.generate_chat_response(user_input)
             print(f"\nAssistant: {response}")
 
+    def get_chat_stats(self) -> Dict[str, Any]:
+        """
+        Prompt token counts for chat calls (estimated and as reported by the API),
+        local answer hit rate and lookup latency, and LLM call latency
+        """
+        stats = dict(self.memory.stats)
+        if self.answer_index is not None:
+            stats.update(self.answer_index.report())
+        calls = self.llm_stats['llm_calls']
+        stats['llm_calls'] = calls
+        stats['llm_latency_ms'] = self.llm_stats['llm_seconds'] * 1000 / calls if calls else 0.0
+        return stats
+
+    def approve_last_answer(self) -> bool:
+        """
+        Add the last LLM answer to the local answer index so repeats skip the LLM
+        """
+        if self.answer_index is None or self.last_llm_exchange is None:
+            return False
+        self.answer_index.approve(*self.last_llm_exchange)
+        self.last_llm_exchange = None
+        return True
+
     def generate_chat_response(self, user_input: str) -> str:
         """
         Generate contextual responses to user questions
         """
         try:
+            # Common questions are answered from curated or approved answers without a round trip
+            if self.answer_index is not None:
+                match = self.answer_index.lookup(user_input)
+                if match:
+                    self.memory.add_exchange(user_input, match['answer'])
+                    return match['answer']
+
             # Build context from previous calculations
-            context = ""
             if self.user_context.get('emissions_data'):
                 emissions = self.user_context['emissions_data']
-                context = f"""
-                User's carbon footprint data:
-                - Daily emissions: {emissions['total']:.2f} kg CO2
-                - Transport: {emissions['transport']:.2f} kg CO2
-                - Energy: {emissions['energy']:.2f} kg CO2
-                - Diet: {emissions['diet']:.2f} kg CO2
-                """
-
-            # Create the conversation prompt
-            messages = [
-                {"role": "system", "content": """
-                You are a knowledgeable and helpful sustainability expert. 
-                Provide specific, actionable advice about carbon footprint reduction.
-                Be conversational and encouraging, but also direct and practical.
-                Use emojis occasionally to make the conversation engaging.
-                If you don't know something, admit it and suggest alternatives.
-                """},
-                *self.conversation_history,
-                {"role": "user", "content": f"""
-                Context: {context}
-                
-                User Question: {user_input}
-                
-                Provide a helpful, specific response. If the user hasn't calculated their footprint yet,
-                encourage them to type 'calculate' to measure their impact.
-                """}
-            ]
+                context = (
+                    f"User's daily footprint: {emissions['total']:.2f} kg CO2 "
+                    f"(transport {emissions['transport']:.2f}, energy {emissions['energy']:.2f}, "
+                    f"diet {emissions['diet']:.2f})."
+                )
+            else:
+                context = "The user hasn't calculated their footprint yet; suggest typing 'calculate'."
+
+            # Create the conversation prompt within the token budget
+            messages = self.memory.build_messages(
+                CHAT_SYSTEM_PROMPT,
+                f"Context: {context}\nQuestion: {user_input}"
+            )
 
             # Get response from OpenAI
-            response = self.client.chat.completions.create(
+            start = time.perf_counter()
+            response = self.scheduler.chat_completion(
+                priority=PRIORITY_INTERACTIVE,
                 model="gpt-3.5-turbo",
                 messages=messages,
                 max_tokens=300,
                 temperature=0.7
             )
+            self.llm_stats['llm_calls'] += 1
+            self.llm_stats['llm_seconds'] += time.perf_counter() - start
+
+            usage = getattr(response, 'usage', None)
+            self.memory.record_usage(getattr(usage, 'prompt_tokens', None))
 
-            # Store conversation history (keep last 5 exchanges)
-            self.conversation_history.append({"role": "user", "content": user_input})
+            # Store the exchange; older turns are folded into a running summary
             assistant_response = response.choices[0].message.content.strip()
-            self.conversation_history.append({"role": "assistant", "content": assistant_response})
-            
-            # Keep conversation history manageable
-            if len(self.conversation_history) > 10:
-                self.conversation_history = self.conversation_history[-10:]
+            self.memory.add_exchange(user_input, assistant_response)
+            self.last_llm_exchange = (user_input, assistant_response)
 
             return assistant_response
 
@@ -15,11 +15,116 @@ EMISSION_FACTORS = {
     'vegan': 0.5        # kg CO2 per meal
 }
 
+# Relative uncertainty (lognormal sigma) of each emission factor
+EMISSION_FACTOR_UNCERTAINTY = {
+    'car': 0.15,
+    'bus': 0.25,
+    'train': 0.30,
+    'electricity': 0.20,
+    'meat': 0.40,
+    'vegetarian': 0.30,
+    'vegan': 0.30
+}
+
+# Monte Carlo uncertainty bands
+INPUT_UNCERTAINTY = float(os.getenv('INPUT_UNCERTAINTY', 0.1))  # relative sd of user-reported inputs
+UNCERTAINTY_DRAWS = int(os.getenv('UNCERTAINTY_DRAWS', 20000))
+UNCERTAINTY_SEED = int(os.getenv('UNCERTAINTY_SEED', 42))
+UNCERTAINTY_ENABLED = os.getenv('UNCERTAINTY_ENABLED', 'true').lower() == 'true'
+
+# Versioned emission factor sets by region and effective date
+EMISSION_FACTORS_PATH = os.getenv(
+    'EMISSION_FACTORS_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'emission_factors.json')
+)
+
+# Hourly grid intensity: how far back an as-of match may reach
+GRID_INTENSITY_TOLERANCE_HOURS = int(os.getenv('GRID_INTENSITY_TOLERANCE_HOURS', 24))
+# How long a process reuses a loaded series before re-reading hours written by grid-refresh
+GRID_SERIES_TTL_SECONDS = float(os.getenv('GRID_SERIES_TTL_SECONDS', 300))
+
+# Peer cohort model
+COHORT_CLUSTERS = int(os.getenv('COHORT_CLUSTERS', 3))
+COHORT_MODEL_PATH = os.getenv(
+    'COHORT_MODEL_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'models', 'cohort_model.pkl')
+)
+
+# Per-state regional averages built from EPA facility data
+REGIONAL_INDEX_PATH = os.getenv(
+    'REGIONAL_INDEX_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'regional_index.json')
+)
+US_STATES_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'us_states.json')
+
 # API keys
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 EPA_API_KEY = os.getenv('EPA_API_KEY')
 CARBON_INTERFACE_KEY = os.getenv('CARBON_INTERFACE_KEY')
 
+# Shared OpenAI client limits
+OPENAI_MAX_CONCURRENCY = int(os.getenv('OPENAI_MAX_CONCURRENCY', 4))
+OPENAI_REQUESTS_PER_MINUTE = float(os.getenv('OPENAI_REQUESTS_PER_MINUTE', 3500))
+OPENAI_TOKENS_PER_MINUTE = float(os.getenv('OPENAI_TOKENS_PER_MINUTE', 90000))
+OPENAI_REQUEST_TIMEOUT = float(os.getenv('OPENAI_REQUEST_TIMEOUT', 30))
+
+# External data APIs (EPA, Carbon Interface): per-request timeout and circuit breaker
+EXTERNAL_API_TIMEOUT = float(os.getenv('EXTERNAL_API_TIMEOUT', 5))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 3))  # consecutive failures to open
+CIRCUIT_RESET_TIMEOUT = float(os.getenv('CIRCUIT_RESET_TIMEOUT', 30))  # seconds before a trial request
+
+# Chart output: 'png' renders images server-side, 'json' returns Vega-Lite specs
+CHART_OUTPUT = os.getenv('CHART_OUTPUT', 'png')
+# The Streamlit app renders specs natively in the browser, so it overrides the default
+STREAMLIT_CHART_OUTPUT = os.getenv('STREAMLIT_CHART_OUTPUT', 'json')
+
+# Overall deadline (seconds) for concurrent api_interface calls
+API_DEADLINE = float(os.getenv('API_DEADLINE', 10))
+# Stages left running at the deadline are kept for collect_pending() this long, up to this many requests
+PENDING_REQUEST_TTL = float(os.getenv('PENDING_REQUEST_TTL', 300))
+PENDING_REQUESTS_MAX = int(os.getenv('PENDING_REQUESTS_MAX', 100))
+
+# Chat memory token budgets
+CHAT_TOKEN_BUDGET = int(os.getenv('CHAT_TOKEN_BUDGET', 1500))
+CHAT_RECENT_TOKEN_BUDGET = int(os.getenv('CHAT_RECENT_TOKEN_BUDGET', 600))
+CHAT_SUMMARY_TOKEN_BUDGET = int(os.getenv('CHAT_SUMMARY_TOKEN_BUDGET', 250))
+
+# Local answer index: questions matching a curated or approved answer this closely skip the LLM
+ANSWER_INDEX_ENABLED = os.getenv('ANSWER_INDEX_ENABLED', 'true').lower() == 'true'
+# Cosine similarity scaled by vocabulary coverage; tuned with `main.py --mode check-answers`
+ANSWER_MATCH_THRESHOLD = float(os.getenv('ANSWER_MATCH_THRESHOLD', 0.5))
+ANSWER_BANK_PATH = os.getenv(
+    'ANSWER_BANK_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'answer_bank.json')
+)
+APPROVED_ANSWERS_PATH = os.getenv(
+    'APPROVED_ANSWERS_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'approved_answers.json')
+)
+
+# Retention: raw user_data rows older than this are folded into daily summaries
+RETENTION_DAYS = int(os.getenv('RETENTION_DAYS', 90))
+VACUUM_PAGES_PER_RUN = int(os.getenv('VACUUM_PAGES_PER_RUN', 1000))
+
+# Write-behind queue for user_data: rows arriving within WRITE_QUEUE_MAX_DELAY seconds share a commit
+WRITE_QUEUE_BATCH_SIZE = int(os.getenv('WRITE_QUEUE_BATCH_SIZE', 256))
+WRITE_QUEUE_MAX_DELAY = float(os.getenv('WRITE_QUEUE_MAX_DELAY', 0.05))
+WRITE_QUEUE_MAX_SIZE = int(os.getenv('WRITE_QUEUE_MAX_SIZE', 10000))
+
+# Profiling: 'sampling' writes folded stacks for flamegraphs, 'cprofile' writes pstats files
+PROFILE_ENABLED = os.getenv('PROFILE_ENABLED', 'false').lower() == 'true'
+PROFILE_MODE = os.getenv('PROFILE_MODE', 'sampling')
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 1.0))  # share of requests profiled
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', 5))
+PROFILE_TOP_ALLOCATIONS = int(os.getenv('PROFILE_TOP_ALLOCATIONS', 20))
+# Stack frames tracemalloc records per allocation; each frame adds overhead to every
+# allocation, so deeper traces distort the CPU profile. 0 turns allocation capture off.
+PROFILE_TRACEMALLOC_FRAMES = int(os.getenv('PROFILE_TRACEMALLOC_FRAMES', 1))
+PROFILE_OUTPUT_DIR = os.getenv(
+    'PROFILE_OUTPUT_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'profiles')
+)
+
 # Database Configuration
 DATABASE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), 
                             'data', 'carbon_footprint.db')
\ No newline at end of file
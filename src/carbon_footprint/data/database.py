@@ -12,12 +12,14 @@ class Database:
         # Create the data directory if it doesn't exist
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
 
-    def get_connection(self):
-        return sqlite3.connect(self.db_path)
+    def get_connection(self, timeout=5.0):
+        return sqlite3.connect(self.db_path, timeout=timeout)
 
     def initialize_database(self):
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            # Only takes effect on a new database; RetentionManager converts existing ones
+            cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS user_data (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -29,32 +31,129 @@ class Database:
                     meat_meals FLOAT,
                     veg_meals FLOAT,
                     vegan_meals FLOAT,
-                    total_emissions FLOAT
+                    total_emissions FLOAT,
+                    factor_version TEXT,
+                    region TEXT
+                )
+            ''')
+            # Databases created by earlier versions lack the newer columns
+            columns = [row[1] for row in cursor.execute('PRAGMA table_info(user_data)')]
+            for column in ('factor_version', 'region'):
+                if column not in columns:
+                    cursor.execute(f'ALTER TABLE user_data ADD COLUMN {column} TEXT')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS ingest_checkpoints (
+                    source TEXT PRIMARY KEY,
+                    rows_done INTEGER,
+                    updated_at DATETIME
+                )
+            ''')
+            # Daily rollups of user_data rows older than the retention window
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS user_data_summary (
+                    day DATE,
+                    region TEXT NOT NULL DEFAULT '',
+                    row_count INTEGER,
+                    car_km FLOAT,
+                    bus_km FLOAT,
+                    train_km FLOAT,
+                    electricity_kwh FLOAT,
+                    meat_meals FLOAT,
+                    veg_meals FLOAT,
+                    vegan_meals FLOAT,
+                    total_emissions FLOAT,
+                    factor_version TEXT,
+                    PRIMARY KEY (day, region)
                 )
             ''')
             conn.commit()
 
+    @staticmethod
+    def user_data_row(data_dict, timestamp=None):
+        """
+        Build a save_many() row from validated input plus total_emissions,
+        factor_version and region
+        """
+        return (
+            timestamp or datetime.now(),
+            data_dict['car_km'],
+            data_dict['bus_km'],
+            data_dict['train_km'],
+            data_dict['electricity'],
+            data_dict['meat_meals'],
+            data_dict['veg_meals'],
+            data_dict['vegan_meals'],
+            data_dict['total_emissions'],
+            data_dict.get('factor_version'),
+            data_dict.get('region')
+        )
+
     def save_user_data(self, data_dict):
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 INSERT INTO user_data (
                     timestamp, car_km, bus_km, train_km, electricity_kwh,
-                    meat_meals, veg_meals, vegan_meals, total_emissions
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                datetime.now(),
-                data_dict['car_km'],
-                data_dict['bus_km'],
-                data_dict['train_km'],
-                data_dict['electricity'],
-                data_dict['meat_meals'],
-                data_dict['veg_meals'],
-                data_dict['vegan_meals'],
-                data_dict['total_emissions']
-            ))
+                    meat_meals, veg_meals, vegan_meals, total_emissions, factor_version, region
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', self.user_data_row(data_dict))
             conn.commit()
 
+    def save_many(self, rows, checkpoint=None):
+        """
+        Insert many user_data rows in a single transaction.
+        rows is an iterable of (timestamp, car_km, bus_km, train_km, electricity_kwh,
+        meat_meals, veg_meals, vegan_meals, total_emissions, factor_version, region) tuples.
+        If checkpoint is a (source, rows_done) pair it is committed atomically with the rows.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany('''
+                INSERT INTO user_data (
+                    timestamp, car_km, bus_km, train_km, electricity_kwh,
+                    meat_meals, veg_meals, vegan_meals, total_emissions, factor_version, region
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            if checkpoint:
+                source, rows_done = checkpoint
+                cursor.execute('''
+                    INSERT OR REPLACE INTO ingest_checkpoints (source, rows_done, updated_at)
+                    VALUES (?, ?, ?)
+                ''', (source, rows_done, datetime.now()))
+            conn.commit()
+
+    def get_ingest_checkpoint(self, source):
+        with self.get_connection() as conn:
+            row = conn.execute(
+                'SELECT rows_done FROM ingest_checkpoints WHERE source = ?', (source,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def reset_ingest_checkpoint(self, source):
+        with self.get_connection() as conn:
+            conn.execute('DELETE FROM ingest_checkpoints WHERE source = ?', (source,))
+            conn.commit()
+
+    def load_history(self, columns=None):
+        """
+        Load emissions history as one DataFrame: compacted days first, as per-entry
+        averages from user_data_summary, followed by the raw user_data rows
+        """
+        columns = columns or ['timestamp', 'car_km', 'bus_km', 'train_km', 'electricity_kwh',
+                              'meat_meals', 'veg_meals', 'vegan_meals', 'total_emissions']
+        summary_columns = [
+            'day AS timestamp' if col == 'timestamp' else f'{col} / row_count AS {col}'
+            for col in columns
+        ]
+        with self.get_connection() as conn:
+            summaries = pd.read_sql_query(
+                f"SELECT {', '.join(summary_columns)} FROM user_data_summary ORDER BY day", conn
+            )
+            raw = pd.read_sql_query(f"SELECT {', '.join(columns)} FROM user_data ORDER BY id", conn)
+        if summaries.empty:
+            return raw
+        return pd.concat([summaries, raw], ignore_index=True)
+
 class DataValidator:
     @staticmethod
     def clean_data(df):
@@ -0,0 +1,163 @@
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import numpy as np
+import pandas as pd
+from .database import Database
+from ..config.settings import GRID_INTENSITY_TOLERANCE_HOURS, GRID_SERIES_TTL_SECONDS
+from ..utils.emissions_api import EmissionsDataAPI
+from ..utils.timestamps import to_utc, local_to_utc, utc_to_local
+
+
+class GridIntensityStore:
+    """
+    Locally stored hourly grid carbon intensity (kg CO2 per kWh) per region.
+    The series is refreshed in bulk, and calculations join usage records to it
+    as-of their timestamp without any network calls.
+
+    Hours are stored as naive UTC. Usage timestamps and `when` arguments are naive
+    local time, like user_data, and are converted before lookups.
+    """
+    def __init__(self, db=None, tolerance_hours=GRID_INTENSITY_TOLERANCE_HOURS,
+                 ttl_seconds=GRID_SERIES_TTL_SECONDS):
+        self.db = db or Database()
+        self.tolerance = pd.Timedelta(hours=tolerance_hours)
+        self.ttl = ttl_seconds
+        # region -> (loaded at, sorted hour array, intensity array), loaded lazily from
+        # SQLite and reloaded after ttl so long-running processes see later refreshes
+        self._series = {}
+        self._ensure_table()
+
+    def _ensure_table(self):
+        with self.db.get_connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS grid_intensity (
+                    region TEXT,
+                    hour DATETIME,
+                    intensity FLOAT,
+                    PRIMARY KEY (region, hour)
+                )
+            ''')
+            conn.commit()
+
+    def save_series(self, region: str, df: pd.DataFrame) -> int:
+        """
+        Upsert a DataFrame with 'hour' and 'intensity' (kg CO2/kWh) columns for a region.
+        Hours with a UTC offset are converted; naive hours are taken to be UTC.
+        """
+        hours = to_utc(df['hour']).dt.floor('h').dt.strftime('%Y-%m-%d %H:%M:%S')
+        rows = list(zip([region] * len(df), hours, df['intensity'].astype(float)))
+        with self.db.get_connection() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO grid_intensity (region, hour, intensity) VALUES (?, ?, ?)',
+                rows
+            )
+            conn.commit()
+        self._series.pop(region, None)
+        return len(rows)
+
+    def refresh(self, region: str, days: int = 7, country_code: str = "US") -> int:
+        """
+        Fetch the last `days` of hourly intensity for a region in one request and store it
+        """
+        end = datetime.now(timezone.utc)
+        records = EmissionsDataAPI().get_grid_intensity_history(
+            country_code, region, end - timedelta(days=days), end
+        )
+        if not records:
+            return 0
+
+        df = pd.DataFrame(records)
+        df = pd.DataFrame({
+            'hour': df['datetime'],
+            'intensity': pd.to_numeric(df['carbon_intensity'], errors='coerce') / 1000.0  # g -> kg
+        }).dropna()
+        return self.save_series(region, df)
+
+    def load_csv(self, path: str) -> int:
+        """
+        Bulk load a CSV with region, hour (UTC unless it carries an offset) and
+        intensity (kg CO2/kWh) columns
+        """
+        df = pd.read_csv(path)
+        return sum(self.save_series(region, group) for region, group in df.groupby('region'))
+
+    def _arrays(self, region: str):
+        cached = self._series.get(region)
+        if cached is None or time.monotonic() - cached[0] > self.ttl:
+            with self.db.get_connection() as conn:
+                df = pd.read_sql_query(
+                    'SELECT hour, intensity FROM grid_intensity WHERE region = ? ORDER BY hour',
+                    conn, params=(region,)
+                )
+            cached = (
+                time.monotonic(),
+                pd.to_datetime(df['hour']).to_numpy(dtype='datetime64[ns]'),
+                df['intensity'].to_numpy(dtype=float)
+            )
+            self._series[region] = cached
+        return cached[1], cached[2]
+
+    def get_series(self, region: str) -> pd.DataFrame:
+        """Hourly series for a region, hours in naive UTC"""
+        hours, intensity = self._arrays(region)
+        return pd.DataFrame({'hour': hours, 'intensity': intensity})
+
+    def intensity_at(self, region: str, when: Optional[datetime] = None) -> Optional[float]:
+        """
+        Intensity of the latest hour at or before `when` (local time, default now),
+        or None if there is none within tolerance
+        """
+        hours, intensity = self._arrays(region)
+        if when is None:
+            when = datetime.now(timezone.utc).replace(tzinfo=None)
+        else:
+            when = local_to_utc(pd.Series([when]))[0]
+        when = pd.Timestamp(when).to_datetime64()
+        idx = np.searchsorted(hours, when, side='right') - 1
+        if idx < 0 or when - hours[idx] > self.tolerance.to_timedelta64():
+            return None
+        return float(intensity[idx])
+
+    def join_usage(self, usage_df: pd.DataFrame, region=None,
+                   timestamp_col: str = 'timestamp') -> pd.Series:
+        """
+        As-of join usage records to the hourly series. region is a single region or a
+        column aligned with usage_df. Returns grid intensity per record (NaN where no
+        hour falls within tolerance), in the original row order.
+        """
+        if region is not None and not np.isscalar(region):
+            region = np.asarray(region, dtype=object)
+        left = pd.DataFrame({
+            'timestamp': local_to_utc(usage_df[timestamp_col]).to_numpy(dtype='datetime64[ns]'),
+            'region': region,
+            'position': np.arange(len(usage_df))
+        })
+        left = left.dropna(subset=['region', 'timestamp'])
+        if left.empty:
+            return pd.Series(np.nan, index=usage_df.index)
+
+        right = pd.concat(
+            [self.get_series(r).assign(region=r) for r in left['region'].unique()],
+            ignore_index=True
+        ).sort_values('hour')
+
+        joined = pd.merge_asof(
+            left.sort_values('timestamp'), right,
+            left_on='timestamp', right_on='hour', by='region',
+            direction='backward', tolerance=self.tolerance
+        )
+        intensity = np.full(len(usage_df), np.nan)
+        intensity[joined['position'].to_numpy()] = joined['intensity'].to_numpy()
+        return pd.Series(intensity, index=usage_df.index)
+
+    def lowest_carbon_hours(self, region: str, start: datetime, end: datetime, n: int = 5) -> pd.DataFrame:
+        """
+        The n lowest-intensity hours for a region within [start, end], all in local time
+        """
+        series = self.get_series(region)
+        start, end = local_to_utc(pd.Series([start, end]))
+        window = series[(series['hour'] >= start) & (series['hour'] <= end)]
+        lowest = window.nsmallest(n, 'intensity').reset_index(drop=True)
+        lowest['hour'] = utc_to_local(lowest['hour'])
+        return lowest
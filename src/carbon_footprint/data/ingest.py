@@ -0,0 +1,141 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import pandas as pd
+from .database import Database
+from .grid_intensity import GridIntensityStore
+from ..utils.batch_calculator import BatchEmissionsCalculator, ACTIVITY_COLUMNS
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+# Per-process calculator, created on first use so each worker loads the grid series once
+_calculator = None
+
+
+def _process_chunk(chunk_df):
+    """
+    Validate a chunk and compute its emissions. Top-level so worker processes can pickle it.
+    Returns the rows to insert and how many records were dropped for a bad timestamp.
+    """
+    global _calculator
+    if _calculator is None:
+        _calculator = BatchEmissionsCalculator(grid_store=GridIntensityStore())
+    calculator = _calculator
+    valid = calculator.validate_frame(chunk_df)
+    region = chunk_df.loc[valid.index, 'region'] if 'region' in chunk_df.columns else None
+    result = calculator.calculate(valid, region=region)
+    result['timestamp'] = result['timestamp'].dt.strftime(TIMESTAMP_FORMAT)
+    result['region'] = region.astype(object).where(region.notna(), None) if region is not None else None
+    columns = ['timestamp', *ACTIVITY_COLUMNS, 'total_emissions', 'factor_version', 'region']
+    return list(result[columns].itertuples(index=False, name=None)), len(chunk_df) - len(valid)
+
+
+class BulkIngestor:
+    """
+    Stream a CSV or JSONL file of activity records into user_data in fixed-size chunks
+    """
+    def __init__(self, chunk_size=5000, workers=1, db=None):
+        self.chunk_size = chunk_size
+        self.workers = max(1, workers)
+        self.db = db or Database()
+        self.db.initialize_database()
+        self.malformed_lines = 0
+
+    def _detect_format(self, path):
+        return 'jsonl' if path.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+
+    def _read_chunks(self, path, file_format, skip_records):
+        """
+        Yield (records consumed, DataFrame) pairs of at most chunk_size records, starting
+        after skip_records records. Records are counted the way they were when the
+        checkpoint was written: parsed CSV rows, or non-blank JSONL lines including
+        malformed ones, which are skipped and counted in malformed_lines.
+        """
+        if file_format == 'csv':
+            # Skip parsed records rather than file lines, so blank lines and quoted
+            # newlines can't shift a resumed run onto already committed rows
+            for chunk in pd.read_csv(path, chunksize=self.chunk_size):
+                if skip_records >= len(chunk):
+                    skip_records -= len(chunk)
+                    continue
+                chunk = chunk.iloc[skip_records:]
+                skip_records = 0
+                yield len(chunk), chunk
+            return
+
+        with open(path, 'r') as f:
+            lines = (line for line in f if line.strip())
+            for _ in islice(lines, skip_records):
+                pass
+            while True:
+                batch = list(islice(lines, self.chunk_size))
+                if not batch:
+                    break
+                records = []
+                for line in batch:
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        self.malformed_lines += 1
+                yield len(batch), pd.DataFrame(records)
+
+    def _processed_chunks(self, chunks):
+        """
+        Yield (records consumed, (rows, invalid timestamps)) in input order, keeping at
+        most 2 chunks per worker in flight
+        """
+        if self.workers == 1:
+            for size, chunk in chunks:
+                yield size, _process_chunk(chunk)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            in_flight = []
+            for size, chunk in chunks:
+                in_flight.append((size, executor.submit(_process_chunk, chunk)))
+                if len(in_flight) >= self.workers * 2:
+                    size, future = in_flight.pop(0)
+                    yield size, future.result()
+            for size, future in in_flight:
+                yield size, future.result()
+
+    def ingest(self, path, file_format=None, resume=False):
+        """
+        Ingest a file and return the number of rows inserted by this run
+        """
+        source = os.path.abspath(path)
+        file_format = file_format or self._detect_format(path)
+
+        if resume:
+            rows_done = self.db.get_ingest_checkpoint(source)
+            if rows_done:
+                print(f"Resuming {path} after {rows_done} rows")
+        else:
+            self.db.reset_ingest_checkpoint(source)
+            rows_done = 0
+
+        inserted = 0
+        invalid_timestamps = 0
+        self.malformed_lines = 0
+        start = time.perf_counter()
+        chunks = self._read_chunks(path, file_format, rows_done)
+
+        for size, (rows, invalid) in self._processed_chunks(chunks):
+            rows_done += size
+            # Rows and checkpoint are committed together so a resumed run never duplicates a chunk
+            self.db.save_many(rows, checkpoint=(source, rows_done))
+            inserted += len(rows)
+            invalid_timestamps += invalid
+
+            elapsed = time.perf_counter() - start
+            rate = inserted / elapsed if elapsed > 0 else 0.0
+            print(f"Ingested {rows_done} rows ({rate:,.0f} rows/sec)")
+
+        elapsed = time.perf_counter() - start
+        print(f"Finished ingesting {inserted} rows from {path} in {elapsed:.1f}s")
+        if invalid_timestamps or self.malformed_lines:
+            print(f"Skipped {invalid_timestamps} records with a missing or unparseable timestamp "
+                  f"and {self.malformed_lines} malformed lines")
+        return inserted
@@ -0,0 +1,197 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from .database import Database
+from .grid_intensity import GridIntensityStore
+from ..utils.batch_calculator import BatchEmissionsCalculator
+from ..utils.factor_registry import get_factor_registry
+from ..utils.timestamps import parse_local
+
+ROW_COLUMNS = ['id', 'timestamp', 'car_km', 'bus_km', 'train_km', 'electricity_kwh',
+               'meat_meals', 'veg_meals', 'vegan_meals', 'factor_version', 'region']
+
+
+def _recompute_partition(chunk_starts, chunk_size):
+    """
+    Recompute the given chunks. Top-level so worker processes can pickle it.
+    """
+    return EmissionsRecomputer(chunk_size=chunk_size).recompute_chunks(chunk_starts)
+
+
+class EmissionsRecomputer:
+    """
+    Bring stored total_emissions in line with the current emission factor registry.
+    Rows are processed in fixed id chunks, each in its own transaction that also
+    marks the chunk done for the registry fingerprint. The id range and chunk size
+    are recorded when a job starts and reused on resume, so new inserts or a
+    different worker count don't invalidate progress. Only rows whose factor_version
+    differs from the version now effective for their timestamp and region are
+    rewritten, which makes re-running the job a no-op.
+    """
+    def __init__(self, chunk_size=5000, workers=1, refreshers=None, db=None):
+        self.chunk_size = chunk_size
+        self.workers = max(1, workers)
+        # Callables taking a connection, run after recompute to rebuild derived tables
+        self.refreshers = list(refreshers or [])
+        self.db = db or Database()
+        self.db.initialize_database()
+        self.registry = get_factor_registry()
+        self.calculator = BatchEmissionsCalculator(self.registry, GridIntensityStore(self.db))
+        self._ensure_checkpoint_table()
+
+    def _ensure_checkpoint_table(self):
+        with self.db.get_connection() as conn:
+            # Superseded by per-chunk progress; its range keys can't be resumed
+            conn.execute('DROP TABLE IF EXISTS recompute_checkpoints')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS recompute_jobs (
+                    fingerprint TEXT PRIMARY KEY,
+                    max_id INTEGER,
+                    chunk_size INTEGER
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS recompute_chunks (
+                    fingerprint TEXT,
+                    chunk_start INTEGER,
+                    PRIMARY KEY (fingerprint, chunk_start)
+                )
+            ''')
+            conn.commit()
+
+    def _recompute_chunk(self, conn, lo, hi):
+        """
+        Recompute stale rows in [lo, hi] inside the caller's transaction and return how many changed
+        """
+        df = pd.read_sql_query(
+            f"SELECT {', '.join(ROW_COLUMNS)} FROM user_data WHERE id BETWEEN ? AND ?",
+            conn, params=(lo, hi)
+        )
+        if df.empty:
+            return 0
+
+        # Rows without a usable timestamp can't be matched to a factor set and are left as stored
+        timestamps = parse_local(df['timestamp'])
+        df = df[timestamps.notna()]
+        if df.empty:
+            return 0
+        _, expected = self.registry.lookup(timestamps[df.index], df['region'])
+        stale = df[df['factor_version'].to_numpy(dtype=object) != expected]
+        if stale.empty:
+            return 0
+
+        valid = self.calculator.validate_frame(stale)
+        result = self.calculator.calculate(valid, region=stale['region'])
+        conn.executemany(
+            'UPDATE user_data SET total_emissions = ?, factor_version = ? WHERE id = ?',
+            zip(result['total_emissions'].astype(float), result['factor_version'],
+                stale.loc[result.index, 'id'].astype(int).tolist())
+        )
+        return len(result)
+
+    def recompute_chunks(self, chunk_starts):
+        """
+        Recompute each chunk [start, start + chunk_size) and mark it done, one transaction per chunk
+        """
+        fingerprint = self.registry.fingerprint
+        updated = 0
+
+        conn = self.db.get_connection(timeout=60.0)
+        conn.isolation_level = None
+        try:
+            for chunk_lo in chunk_starts:
+                # IMMEDIATE takes the write lock up front so concurrent workers queue instead of deadlocking
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    updated += self._recompute_chunk(conn, chunk_lo, chunk_lo + self.chunk_size - 1)
+                    conn.execute(
+                        'INSERT OR IGNORE INTO recompute_chunks (fingerprint, chunk_start) VALUES (?, ?)',
+                        (fingerprint, chunk_lo)
+                    )
+                    conn.execute('COMMIT')
+                except Exception:
+                    conn.execute('ROLLBACK')
+                    raise
+        finally:
+            conn.close()
+
+        return updated
+
+    def _pending_chunks(self):
+        """
+        Chunk starts not yet done for the current fingerprint. A new job records the
+        current MAX(id) and chunk size; a resumed job reuses them.
+        """
+        fingerprint = self.registry.fingerprint
+        with self.db.get_connection() as conn:
+            job = conn.execute(
+                'SELECT max_id, chunk_size FROM recompute_jobs WHERE fingerprint = ?', (fingerprint,)
+            ).fetchone()
+            if job:
+                max_id, self.chunk_size = job
+                print(f"Resuming recompute for factor sets {fingerprint} up to id {max_id}")
+            else:
+                max_id = conn.execute('SELECT MAX(id) FROM user_data').fetchone()[0]
+                if max_id is None:
+                    return []
+                conn.execute(
+                    'INSERT INTO recompute_jobs (fingerprint, max_id, chunk_size) VALUES (?, ?, ?)',
+                    (fingerprint, max_id, self.chunk_size)
+                )
+                conn.commit()
+
+            min_id = conn.execute('SELECT MIN(id) FROM user_data').fetchone()[0]
+            done = {row[0] for row in conn.execute(
+                'SELECT chunk_start FROM recompute_chunks WHERE fingerprint = ?', (fingerprint,)
+            )}
+        if min_id is None:
+            return []
+
+        # Chunks are aligned to multiples of chunk_size so their starts are stable across runs
+        first = (min_id - 1) // self.chunk_size * self.chunk_size + 1
+        return [start for start in range(first, max_id + 1, self.chunk_size) if start not in done]
+
+    def _finish_job(self):
+        with self.db.get_connection() as conn:
+            conn.execute('DELETE FROM recompute_jobs')
+            conn.execute('DELETE FROM recompute_chunks')
+            conn.commit()
+
+    def refresh_aggregates(self):
+        """
+        Run each refresher in its own transaction. A failing refresher is rolled back and
+        reported; it doesn't stop the others or leave the recompute job unfinished.
+        """
+        for refresh in self.refreshers:
+            try:
+                with self.db.get_connection() as conn:
+                    refresh(conn)
+                    conn.commit()
+            except Exception as e:
+                print(f"Error running refresher {getattr(refresh, '__qualname__', refresh)}: {e}")
+
+    def run(self):
+        """
+        Recompute every stale row, then refresh dependent aggregates. Returns rows updated.
+        """
+        start = time.perf_counter()
+        chunks = self._pending_chunks()
+
+        if self.workers == 1 or len(chunks) <= 1:
+            updated = self.recompute_chunks(chunks)
+        else:
+            # Contiguous runs of chunks per worker keep each worker's reads sequential
+            partitions = [list(part) for part in np.array_split(chunks, self.workers) if len(part)]
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                futures = [executor.submit(_recompute_partition, [int(c) for c in part], self.chunk_size)
+                           for part in partitions]
+                updated = sum(future.result() for future in futures)
+
+        self.refresh_aggregates()
+        # Every chunk is done; progress rows (including any left by older factor sets) are no longer needed
+        self._finish_job()
+
+        elapsed = time.perf_counter() - start
+        print(f"Recomputed {updated} rows against factor sets {self.registry.fingerprint} in {elapsed:.1f}s")
+        return updated
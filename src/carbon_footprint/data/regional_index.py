@@ -0,0 +1,214 @@
+import json
+import os
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
+from ..config.settings import REGIONAL_INDEX_PATH, US_STATES_PATH
+from ..utils.emissions_api import EmissionsDataAPI
+
+try:
+    import ijson
+except ImportError:  # listed in requirements; without it payloads are parsed in one go
+    ijson = None
+
+# Facility lists are accepted as a top-level array or under one of these keys
+LIST_KEYS = ('facilities', 'data')
+ITEM_PREFIXES = {'item'} | {f'{key}.item' for key in LIST_KEYS}
+
+STATE_FIELDS = ('state', 'state_code', 'stateCode')
+EMISSIONS_FIELDS = ('co2e_emission', 'total_emissions', 'emissions')  # metric tonnes CO2e per year
+
+
+class RegionalEmissionsIndex:
+    """
+    Compact per-state and per-EPA-region emissions averages, aggregated once from
+    EPA facility data and stored on disk. Lookups are dictionary reads, so the
+    comparison chart needs no request-time network access.
+
+    daily_kg_per_capita is reported facility (industrial) emissions divided by
+    resident population. It describes the region's industry, not a typical
+    resident's transport, energy and diet footprint, so it is labelled separately
+    on the comparison chart rather than as a like-for-like average.
+    """
+    def __init__(self, path: str = REGIONAL_INDEX_PATH):
+        self.path = path
+        with open(US_STATES_PATH, 'r') as f:
+            self.states = json.load(f)['states']
+        self.index = self._load()
+        # state -> (facility_count, total_tonnes); seeded from the stored index so builds are incremental
+        self._totals = {
+            state: (entry['facility_count'], entry['total_tonnes'])
+            for state, entry in self.index.get('states', {}).items()
+        }
+        self._lookups = self._build_lookups()
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _field(record: Dict, names):
+        for name in names:
+            if record.get(name) is not None:
+                return record[name]
+        return None
+
+    def add_facilities(self, facilities: Iterable[Dict], replace_states: bool = True) -> int:
+        """
+        Aggregate facility records into per-state totals. With replace_states, totals of
+        every state seen in this batch replace what the index held for it before.
+        """
+        batch = {}
+        count = 0
+        for facility in facilities:
+            state = self._field(facility, STATE_FIELDS)
+            tonnes = self._field(facility, EMISSIONS_FIELDS)
+            if not state or tonnes is None:
+                continue
+            try:
+                tonnes = float(tonnes)
+            except (ValueError, TypeError):
+                continue
+            n, total = batch.get(state.upper(), (0, 0.0))
+            batch[state.upper()] = (n + 1, total + tonnes)
+            count += 1
+
+        for state, (n, total) in batch.items():
+            if not replace_states and state in self._totals:
+                prev_n, prev_total = self._totals[state]
+                n, total = n + prev_n, total + prev_total
+            self._totals[state] = (n, total)
+        return count
+
+    @staticmethod
+    def _iter_json(fileobj):
+        """
+        Yield facility objects from a top-level array or a {"facilities"|"data": [...]}
+        wrapper, streaming with ijson when it is installed
+        """
+        if ijson is None:
+            payload = json.load(fileobj)
+            if isinstance(payload, dict):
+                payload = next((payload[key] for key in LIST_KEYS if isinstance(payload.get(key), list)), [])
+            yield from (item for item in payload if isinstance(item, dict))
+            return
+
+        builder, depth = None, 0
+        for prefix, event, value in ijson.parse(fileobj):
+            if builder is None:
+                if event == 'start_map' and prefix in ITEM_PREFIXES:
+                    builder, depth = ijson.ObjectBuilder(), 0
+                else:
+                    continue
+            builder.event(event, value)
+            if event in ('start_map', 'start_array'):
+                depth += 1
+            elif event in ('end_map', 'end_array'):
+                depth -= 1
+                if depth == 0:
+                    yield builder.value
+                    builder = None
+
+    def ingest_file(self, path: str) -> int:
+        """
+        Stream a local dump: JSON lines (one facility per line), a JSON array, or an
+        array wrapped under "facilities" or "data"
+        """
+        if path.lower().endswith(('.jsonl', '.ndjson')):
+            with open(path, 'r') as f:
+                return self.add_facilities(json.loads(line) for line in f if line.strip())
+
+        with open(path, 'rb') as f:
+            return self.add_facilities(self._iter_json(f))
+
+    def ingest_state(self, state: str) -> int:
+        """
+        Stream one state's facilities straight from the EPA API response body
+        """
+        response = EmissionsDataAPI().stream_regional_emissions_data(state)
+        if response is None:
+            return 0
+        with response:
+            return self.add_facilities(self._iter_json(response.raw))
+
+    def _per_capita(self, tonnes: float, population: int) -> Optional[float]:
+        # Annual tonnes -> daily kg per resident
+        return tonnes * 1000 / 365 / population if population else None
+
+    def build(self) -> Dict:
+        """
+        Compute averages from the aggregated totals and write the index to disk
+        """
+        states, regions = {}, {}
+        national_tonnes, national_population = 0.0, 0
+        for state, (count, tonnes) in self._totals.items():
+            info = self.states.get(state, {})
+            population = info.get('population')
+            states[state] = {
+                'facility_count': count,
+                'total_tonnes': tonnes,
+                'epa_region': info.get('epa_region'),
+                'daily_kg_per_capita': self._per_capita(tonnes, population)
+            }
+            if population:
+                region_tonnes, region_population = regions.get(info['epa_region'], (0.0, 0))
+                regions[info['epa_region']] = (region_tonnes + tonnes, region_population + population)
+                national_tonnes += tonnes
+                national_population += population
+
+        self.index = {
+            'built_at': datetime.now().isoformat(),
+            'states': states,
+            'epa_regions': {
+                str(region): {'daily_kg_per_capita': self._per_capita(tonnes, population)}
+                for region, (tonnes, population) in regions.items()
+            },
+            'national': {'daily_kg_per_capita': self._per_capita(national_tonnes, national_population)}
+        }
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.path)
+
+        self._lookups = self._build_lookups()
+        return self.index
+
+    def _build_lookups(self) -> Dict[str, Dict]:
+        """
+        Precompute the chart-ready dict for every state so lookup() is a single dict read
+        """
+        national = self.index.get('national', {}).get('daily_kg_per_capita')
+        regions = self.index.get('epa_regions', {})
+        lookups = {}
+        for state, entry in self.index.get('states', {}).items():
+            if entry.get('daily_kg_per_capita') is None:
+                continue
+            lookups[state] = {
+                'average_emissions': entry['daily_kg_per_capita'],
+                'national_average': national,
+                'epa_region_average': regions.get(str(entry.get('epa_region')), {}).get('daily_kg_per_capita'),
+                'facility_count': entry['facility_count'],
+                'source': 'epa_facilities'
+            }
+        return lookups
+
+    def lookup(self, state: Optional[str]) -> Optional[Dict]:
+        """
+        Regional data for create_comparison_chart, or None if the state isn't indexed
+        """
+        if not state:
+            return None
+        return self._lookups.get(state.upper())
+
+
+@lru_cache(maxsize=None)
+def get_regional_index(path: str = REGIONAL_INDEX_PATH) -> RegionalEmissionsIndex:
+    """
+    Process-wide index, loaded from disk once per path
+    """
+    return RegionalEmissionsIndex(path)
@@ -0,0 +1,170 @@
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict
+import numpy as np
+import pandas as pd
+from .database import Database
+from ..config.settings import RETENTION_DAYS, VACUUM_PAGES_PER_RUN
+from ..utils.batch_calculator import ACTIVITY_COLUMNS
+from ..utils.factor_registry import FACTOR_KEYS, get_factor_registry
+
+SUM_COLUMNS = ['car_km', 'bus_km', 'train_km', 'electricity_kwh',
+               'meat_meals', 'veg_meals', 'vegan_meals', 'total_emissions']
+# Summary columns whose factor doesn't depend on the hour; electricity may have used the hourly grid
+FIXED_FACTOR_COLUMNS = {col: factor for col, factor in ACTIVITY_COLUMNS.items() if factor != 'electricity'}
+
+
+class RetentionManager:
+    """
+    Keeps recent user_data rows raw and folds older ones into daily per-region sums
+    in user_data_summary, then reclaims the freed pages with incremental vacuum.
+    """
+    def __init__(self, retention_days: int = RETENTION_DAYS,
+                 vacuum_pages: int = VACUUM_PAGES_PER_RUN, db=None):
+        self.retention_days = retention_days
+        self.vacuum_pages = vacuum_pages
+        self.db = db or Database()
+        self.db.initialize_database()
+        self._timer = None
+
+    def _database_size(self, conn) -> int:
+        page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+        page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+        wal_path = f"{self.db.db_path}-wal"
+        wal_size = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+        return page_size * page_count + wal_size
+
+    def compact(self, conn) -> int:
+        """
+        Fold rows older than the retention window into daily summaries and delete them,
+        in one transaction. Returns the number of raw rows removed.
+        """
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).strftime('%Y-%m-%d')
+        sums = ', '.join(f'SUM({col})' for col in SUM_COLUMNS)
+        updates = ', '.join(f'{col} = {col} + excluded.{col}' for col in SUM_COLUMNS)
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(f'''
+                INSERT INTO user_data_summary (day, region, row_count, {', '.join(SUM_COLUMNS)}, factor_version)
+                SELECT date(timestamp), COALESCE(region, ''), COUNT(*), {sums}, MAX(factor_version)
+                FROM user_data
+                WHERE timestamp < ?
+                GROUP BY date(timestamp), COALESCE(region, '')
+                ON CONFLICT(day, region) DO UPDATE SET
+                    row_count = row_count + excluded.row_count, {updates},
+                    factor_version = excluded.factor_version
+            ''', (cutoff,))
+            removed = conn.execute('DELETE FROM user_data WHERE timestamp < ?', (cutoff,)).rowcount
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return removed
+
+    def reclaim(self, conn):
+        """
+        Release free pages to the filesystem and truncate the WAL
+        """
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+            # Databases created before incremental vacuum was enabled need one full VACUUM to switch
+            conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            conn.execute('VACUUM')
+        else:
+            # executescript steps the pragma to completion; execute() frees only one page
+            conn.executescript(f'PRAGMA incremental_vacuum({int(self.vacuum_pages)});')
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+    def run(self) -> Dict[str, int]:
+        """
+        Compact and reclaim space once, returning a size report
+        """
+        conn = self.db.get_connection(timeout=60.0)
+        conn.isolation_level = None
+        try:
+            size_before = self._database_size(conn)
+            rows_reclaimed = self.compact(conn)
+            free_pages_before = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            self.reclaim(conn)
+            report = {
+                'rows_reclaimed': rows_reclaimed,
+                'raw_rows': conn.execute('SELECT COUNT(*) FROM user_data').fetchone()[0],
+                'summary_rows': conn.execute('SELECT COUNT(*) FROM user_data_summary').fetchone()[0],
+                'size_before_bytes': size_before,
+                'size_after_bytes': self._database_size(conn),
+                'free_pages_before': free_pages_before,
+                'free_pages': conn.execute('PRAGMA freelist_count').fetchone()[0]
+            }
+        finally:
+            conn.close()
+
+        print(f"Retention: folded {report['rows_reclaimed']} rows into summaries, "
+              f"database {report['size_before_bytes'] / 1e6:.1f} MB -> {report['size_after_bytes'] / 1e6:.1f} MB, "
+              f"free pages {report['free_pages_before']} -> {report['free_pages']}")
+        return report
+
+    def start(self, interval_hours: float):
+        """
+        Run now and then every interval_hours on a daemon thread
+        """
+        def tick():
+            try:
+                self.run()
+            except Exception as e:
+                print(f"Error running retention: {e}")
+            self._timer = threading.Timer(interval_hours * 3600, tick)
+            self._timer.daemon = True
+            self._timer.start()
+
+        tick()
+
+    def stop(self):
+        if self._timer is not None:
+            self._timer.cancel()
+
+    @staticmethod
+    def refresh_summaries(conn):
+        """
+        Bring summaries whose factor_version is stale in line with the factor set now in
+        effect for their day and region. Only the fixed-factor terms (transport and diet)
+        are swapped: the stored total minus those terms under the old set is the energy
+        component, which may have used hourly grid intensity and is kept as stored.
+        Re-running is a no-op. Usable as an EmissionsRecomputer refresher.
+        """
+        df = pd.read_sql_query('SELECT * FROM user_data_summary', conn)
+        if df.empty:
+            return
+
+        registry = get_factor_registry()
+        regions = df['region'].where(df['region'] != '', None)
+        factors, expected = registry.lookup(pd.to_datetime(df['day']), regions)
+        stale = (df['factor_version'].to_numpy(dtype=object) != expected).nonzero()[0]
+        if not len(stale):
+            return
+
+        columns = list(FIXED_FACTOR_COLUMNS)
+        factor_idx = [FACTOR_KEYS.index(factor) for factor in FIXED_FACTOR_COLUMNS.values()]
+        sums = df[columns].fillna(0.0).to_numpy(dtype=float)[stale]
+        new_terms = (sums * factors[stale][:, factor_idx]).sum(axis=1)
+
+        old_factors = np.zeros((len(stale), len(columns)))
+        known = np.ones(len(stale), dtype=bool)
+        for row, version in enumerate(df['factor_version'].to_numpy(dtype=object)[stale]):
+            old = registry.factors_by_version(version)
+            if old is None:
+                known[row] = False
+            else:
+                old_factors[row] = [old[factor] for factor in FIXED_FACTOR_COLUMNS.values()]
+        totals = df['total_emissions'].fillna(0.0).to_numpy(dtype=float)[stale]
+        totals = totals - (sums * old_factors).sum(axis=1) + new_terms
+
+        # A version no longer in the registry can't be separated; reprice those rows in full
+        electricity = df['electricity_kwh'].fillna(0.0).to_numpy(dtype=float)[stale]
+        totals = np.where(known, totals,
+                          new_terms + electricity * factors[stale, FACTOR_KEYS.index('electricity')])
+
+        conn.executemany(
+            'UPDATE user_data_summary SET total_emissions = ?, factor_version = ? WHERE day = ? AND region = ?',
+            zip(totals.tolist(), expected[stale], df['day'].iloc[stale], df['region'].iloc[stale])
+        )
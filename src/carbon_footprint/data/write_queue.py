@@ -0,0 +1,104 @@
+import atexit
+import queue
+import threading
+import time
+from functools import lru_cache
+from typing import Optional
+from .database import Database
+from ..config.settings import WRITE_QUEUE_BATCH_SIZE, WRITE_QUEUE_MAX_DELAY, WRITE_QUEUE_MAX_SIZE
+
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """
+    Single background writer for user_data rows. put() returns immediately; the
+    writer collects rows arriving within max_delay of each other (up to max_batch)
+    and commits them together with Database.save_many. Callers that need to read
+    their own writes call flush() first. Rows still queued are committed on close(),
+    which runs at interpreter exit.
+    """
+    def __init__(self, db=None, max_batch: int = WRITE_QUEUE_BATCH_SIZE,
+                 max_delay: float = WRITE_QUEUE_MAX_DELAY, max_size: int = WRITE_QUEUE_MAX_SIZE):
+        self.db = db or Database()
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        # Bounded so a stalled database applies backpressure instead of growing memory
+        self._queue = queue.Queue(maxsize=max_size)
+        self._cond = threading.Condition()
+        self._enqueued = 0
+        self._processed = 0
+        self.stats = {'rows_written': 0, 'commits': 0, 'rows_failed': 0}
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='user-data-writer', daemon=True)
+        self._thread.start()
+
+    def put(self, row: tuple):
+        """Queue one save_many() row, e.g. from Database.user_data_row()"""
+        if self._closed:
+            raise RuntimeError("Write queue is closed")
+        with self._cond:
+            self._enqueued += 1
+        self._queue.put(row)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every row queued before this call has been committed (or has failed).
+        Returns False if timeout expired first.
+        """
+        with self._cond:
+            target = self._enqueued
+            return self._cond.wait_for(lambda: self._processed >= target, timeout)
+
+    def close(self, timeout: Optional[float] = None):
+        """Commit everything still queued and stop the writer"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _next_batch(self):
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                row = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if row is _STOP:
+                return batch, True
+            batch.append(row)
+        return batch, False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            if not batch:
+                continue
+            try:
+                self.db.save_many(batch)
+                self.stats['rows_written'] += len(batch)
+                self.stats['commits'] += 1
+            except Exception as e:
+                self.stats['rows_failed'] += len(batch)
+                print(f"Error writing {len(batch)} queued rows: {e}")
+            with self._cond:
+                self._processed += len(batch)
+                self._cond.notify_all()
+
+
+@lru_cache(maxsize=None)
+def get_write_queue() -> WriteBehindQueue:
+    """
+    Process-wide writer, so every bot instance (Streamlit reruns create one per
+    run) shares one writer thread and commit stream
+    """
+    write_queue = WriteBehindQueue()
+    atexit.register(write_queue.close)
+    return write_queue
@@ -1,15 +1,119 @@
 from carbon_footprint.bot.carbon_bot import CarbonFootprintBot
+from carbon_footprint.data.ingest import BulkIngestor
+from carbon_footprint.data.recompute import EmissionsRecomputer
+from carbon_footprint.data.grid_intensity import GridIntensityStore
+from carbon_footprint.data.database import Database
+from carbon_footprint.data.regional_index import RegionalEmissionsIndex
+from carbon_footprint.data.retention import RetentionManager
+from carbon_footprint.models.cohort_model import PeerCohortModel
+from carbon_footprint.utils.answer_index import AnswerIndex
+from carbon_footprint.utils.profiler import configure_profiler, PROFILE_MODES
+from carbon_footprint.config.settings import RETENTION_DAYS, PROFILE_SAMPLE_RATE, PROFILE_TRACEMALLOC_FRAMES
 import argparse
+import sys
+import time
 
 def main():
     parser = argparse.ArgumentParser(description='Carbon Footprint Calculator')
-    parser.add_argument('--mode', choices=['terminal', 'api', 'chat'],
-                       help='Run in terminal, API, or chat mode')
+    parser.add_argument('--mode', choices=['terminal', 'api', 'chat', 'ingest', 'recompute', 'grid-refresh',
+                                           'train-cohorts', 'regional-index', 'retention', 'check-answers'],
+                       help='Run in terminal, API, chat, bulk ingest, factor recompute, '
+                            'grid intensity refresh, cohort training, regional index, '
+                            'retention, or answer bank check mode')
     parser.add_argument('--location', nargs=3, metavar=('LATITUDE', 'LONGITUDE', 'REGION'),
                        help='Your location (latitude longitude region)')
+    parser.add_argument('--input', help='CSV or JSONL file of activity records (ingest mode), '
+                                        'CSV of hourly intensities (grid-refresh mode), '
+                                        'or EPA facility dump (regional-index mode)')
+    parser.add_argument('--format', choices=['csv', 'jsonl'],
+                       help='Input file format, detected from the extension if omitted')
+    parser.add_argument('--chunk-size', type=int, default=5000,
+                       help='Records per chunk in ingest and recompute modes')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Worker processes used in ingest and recompute modes')
+    parser.add_argument('--resume', action='store_true',
+                       help='Resume ingest from the last committed checkpoint')
+    parser.add_argument('--region', action='append',
+                       help='Region to refresh in grid-refresh or regional-index mode (repeatable)')
+    parser.add_argument('--days', type=int, default=7,
+                       help='Days of hourly grid intensity to fetch in grid-refresh mode')
+    parser.add_argument('--retention-days', type=int,
+                       help='Keep raw rows this many days in retention mode')
+    parser.add_argument('--interval-hours', type=float,
+                       help='Repeat retention on this schedule instead of running once')
+    parser.add_argument('--profile', nargs='?', const='sampling', choices=PROFILE_MODES,
+                       help='Profile requests and LLM calls: sampling (folded stacks for flamegraphs, '
+                            'the default) or cprofile (pstats files)')
+    parser.add_argument('--profile-rate', type=float, default=PROFILE_SAMPLE_RATE,
+                       help='Share of requests to profile, between 0 and 1')
+    parser.add_argument('--profile-frames', type=int, default=PROFILE_TRACEMALLOC_FRAMES,
+                       help='Stack frames traced per allocation while profiling; 0 skips allocation '
+                            'capture so the CPU profile runs without tracemalloc overhead')
     
     args = parser.parse_args()
     
+    if args.profile:
+        configure_profiler(enabled=True, mode=args.profile, sample_rate=args.profile_rate,
+                           tracemalloc_frames=args.profile_frames)
+    
+    if args.mode == 'ingest':
+        if not args.input:
+            parser.error('--input is required in ingest mode')
+        ingestor = BulkIngestor(chunk_size=args.chunk_size, workers=args.workers)
+        ingestor.ingest(args.input, file_format=args.format, resume=args.resume)
+        return
+    
+    if args.mode == 'recompute':
+        recomputer = EmissionsRecomputer(chunk_size=args.chunk_size, workers=args.workers,
+                                         refreshers=[RetentionManager.refresh_summaries,
+                                                     PeerCohortModel.rebuild])
+        recomputer.run()
+        return
+    
+    if args.mode == 'grid-refresh':
+        store = GridIntensityStore()
+        if args.input:
+            print(f"Loaded {store.load_csv(args.input)} hourly intensities from {args.input}")
+        for region in args.region or []:
+            print(f"Stored {store.refresh(region, days=args.days)} hourly intensities for {region}")
+        return
+    
+    if args.mode == 'regional-index':
+        index = RegionalEmissionsIndex()
+        if args.input:
+            print(f"Aggregated {index.ingest_file(args.input)} facilities from {args.input}")
+        for state in args.region or []:
+            print(f"Aggregated {index.ingest_state(state)} facilities for {state}")
+        built = index.build()
+        print(f"Regional index covers {len(built['states'])} states")
+        return
+    
+    if args.mode == 'retention':
+        manager = RetentionManager(retention_days=args.retention_days or RETENTION_DAYS)
+        if args.interval_hours:
+            manager.start(args.interval_hours)
+            while True:
+                time.sleep(3600)
+        else:
+            manager.run()
+        return
+    
+    if args.mode == 'train-cohorts':
+        with Database().get_connection() as conn:
+            model = PeerCohortModel.rebuild(conn)
+        if model.cohort_sizes is None:
+            print("Not enough data to train peer cohorts")
+        else:
+            print(f"Trained {model.n_clusters} peer cohorts of sizes {model.cohort_sizes.tolist()}")
+        return
+    
+    if args.mode == 'check-answers':
+        failures = AnswerIndex().check()
+        for failure in failures:
+            print(failure)
+        print(f"Answer bank check: {len(failures)} failures")
+        sys.exit(1 if failures else 0)
+    
     # Initialize the bot
     bot = CarbonFootprintBot()
     
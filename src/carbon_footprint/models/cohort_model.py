@@ -0,0 +1,187 @@
+import os
+import pickle
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.preprocessing import StandardScaler
+from ..config.settings import COHORT_MODEL_PATH, COHORT_CLUSTERS
+
+FEATURES = ['car_km', 'bus_km', 'train_km', 'electricity_kwh',
+            'meat_meals', 'veg_meals', 'vegan_meals']
+PERCENTILES = np.arange(101)
+# Fixed bins for the percentile tables (kg CO2 per day). Counts per bin merge across
+# chunks, so memory doesn't grow with the number of rows; totals above the last edge
+# are counted in the last bin.
+TOTAL_BIN_EDGES = np.linspace(0.0, 500.0, 10001)
+
+
+class PeerCohortModel:
+    """
+    Groups users into peer cohorts by activity profile. Trained incrementally over
+    batches streamed from user_data, then summarised into per-cohort percentile
+    tables so comparing one user to their peers is a constant-time lookup. The tables
+    are read from weighted histograms over TOTAL_BIN_EDGES, accurate to one bin width.
+    Days compacted into user_data_summary by retention take part as their daily
+    per-region mean profile, weighted by row_count.
+    """
+    def __init__(self, n_clusters: int = COHORT_CLUSTERS):
+        self.n_clusters = n_clusters
+        self.scaler = StandardScaler()
+        self.kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=42, n_init=3)
+        self.centers = None
+        self.cohort_percentiles = None
+        self.cohort_means = None
+        self.cohort_sizes = None
+        self.population_percentiles = None
+        self.population_mean = None
+        self.region_means = {}
+
+    def _chunks(self, conn, chunk_size):
+        """
+        Yield (features, totals, regions, weights) arrays for raw rows, then summary rows
+        """
+        queries = [f"SELECT {', '.join(FEATURES)}, total_emissions, region, 1 AS weight FROM user_data"]
+        has_summary = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user_data_summary'"
+        ).fetchone()
+        if has_summary:
+            means = ', '.join(f'{col} / row_count AS {col}' for col in FEATURES + ['total_emissions'])
+            queries.append(f"SELECT {means}, NULLIF(region, '') AS region, row_count AS weight "
+                           f"FROM user_data_summary WHERE row_count > 0")
+
+        for query in queries:
+            for chunk in pd.read_sql_query(query, conn, chunksize=chunk_size):
+                # An empty table still yields one empty frame
+                if chunk.empty:
+                    continue
+                yield (chunk[FEATURES].fillna(0.0).to_numpy(dtype=float),
+                       chunk['total_emissions'].fillna(0.0).to_numpy(dtype=float),
+                       chunk['region'],
+                       chunk['weight'].to_numpy(dtype=float))
+
+    def _assign(self, X):
+        # Nearest center on already-scaled features, without sklearn's per-call validation overhead
+        distances = ((X[:, None, :] - self.centers[None, :, :]) ** 2).sum(axis=2)
+        return distances.argmin(axis=1)
+
+    def train(self, conn, chunk_size: int = 10000) -> bool:
+        """
+        Fit the scaler and cohorts with partial_fit over streamed batches, then build
+        the percentile tables. Returns False if there is too little data.
+        """
+        n_rows = 0
+        for X, _, _, weights in self._chunks(conn, chunk_size):
+            self.scaler.partial_fit(X, sample_weight=weights)
+            n_rows += weights.sum()
+        if n_rows < self.n_clusters:
+            return False
+
+        pending, pending_weights = None, None
+        for X, _, _, weights in self._chunks(conn, chunk_size):
+            X = self.scaler.transform(X)
+            # partial_fit needs at least n_clusters samples per call
+            pending = X if pending is None else np.vstack([pending, X])
+            pending_weights = weights if pending_weights is None else np.concatenate([pending_weights, weights])
+            if len(pending) >= self.n_clusters:
+                self.kmeans.partial_fit(pending, sample_weight=pending_weights)
+                pending, pending_weights = None, None
+        if pending is not None:
+            self.kmeans.partial_fit(pending, sample_weight=pending_weights)
+        self.centers = self.kmeans.cluster_centers_
+
+        n_bins = len(TOTAL_BIN_EDGES) - 1
+        histograms = np.zeros((self.n_clusters, n_bins))
+        sums = np.zeros(self.n_clusters)
+        region_sums = {}
+        for X, totals, regions, weights in self._chunks(conn, chunk_size):
+            labels = self._assign(self.scaler.transform(X))
+            # A summary row stands for row_count users at the day's mean total
+            bins = np.clip(np.searchsorted(TOTAL_BIN_EDGES, totals, side='right') - 1, 0, n_bins - 1)
+            np.add.at(histograms, (labels, bins), weights)
+            np.add.at(sums, labels, totals * weights)
+            weighted = pd.DataFrame({'region': regions, 'total': totals * weights, 'count': weights})
+            for region, group in weighted.groupby('region'):
+                total, count = region_sums.get(region, (0.0, 0))
+                region_sums[region] = (total + group['total'].sum(), count + group['count'].sum())
+
+        self._build_tables(histograms, sums)
+        self.region_means = {region: float(total / count) for region, (total, count) in region_sums.items()}
+        return True
+
+    @staticmethod
+    def _histogram_percentiles(counts):
+        """
+        Percentile table of a binned distribution, interpolating linearly within bins
+        """
+        cumulative = np.cumsum(counts)
+        # Percentile 0 is the lower edge of the first occupied bin
+        targets = np.maximum(PERCENTILES / 100 * cumulative[-1], 1e-9)
+        idx = np.minimum(np.searchsorted(cumulative, targets, side='left'), len(counts) - 1)
+        below = cumulative[idx] - counts[idx]
+        fraction = np.divide(targets - below, counts[idx], out=np.zeros(len(targets)), where=counts[idx] > 0)
+        return TOTAL_BIN_EDGES[idx] + np.clip(fraction, 0.0, 1.0) * np.diff(TOTAL_BIN_EDGES)[idx]
+
+    def _build_tables(self, histograms, sums):
+        population = histograms.sum(axis=0)
+        self.population_percentiles = self._histogram_percentiles(population)
+        self.population_mean = float(sums.sum() / population.sum())
+        self.cohort_sizes = histograms.sum(axis=1).round().astype(int)
+        self.cohort_means = np.array([
+            total / size if size else np.nan for total, size in zip(sums, histograms.sum(axis=1))
+        ])
+        self.cohort_percentiles = np.array([
+            self._histogram_percentiles(counts) if counts.sum() else self.population_percentiles
+            for counts in histograms
+        ])
+
+    @staticmethod
+    def _percentile(table, value) -> int:
+        return int(np.clip(np.searchsorted(table, value, side='right') - 1, 0, 100))
+
+    def compare(self, user_data: Dict, total_emissions: float, region: Optional[str] = None) -> Dict:
+        """
+        Place a user in their cohort and report where their total sits among peers
+        """
+        values = {**user_data,
+                  'electricity_kwh': user_data.get('electricity_kwh', user_data.get('electricity', 0.0))}
+        x = np.array([[float(values.get(f, 0.0)) for f in FEATURES]])
+        cohort = int(self._assign((x - self.scaler.mean_) / self.scaler.scale_)[0])
+        table = self.cohort_percentiles[cohort]
+
+        return {
+            'cohort': cohort,
+            'cohort_size': int(self.cohort_sizes[cohort]),
+            'cohort_mean': float(self.cohort_means[cohort]),
+            'cohort_median': float(table[50]),
+            'cohort_percentile': self._percentile(table, total_emissions),
+            'population_mean': self.population_mean,
+            'population_percentile': self._percentile(self.population_percentiles, total_emissions),
+            'regional_mean': self.region_means.get(region)
+        }
+
+    def save(self, path: str = COHORT_MODEL_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            pickle.dump(self, f)
+
+    @staticmethod
+    def load(path: str = COHORT_MODEL_PATH) -> Optional['PeerCohortModel']:
+        """
+        Load a trained model, or None if it hasn't been trained yet
+        """
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    @staticmethod
+    def rebuild(conn):
+        """
+        Retrain from a connection and save; usable as an EmissionsRecomputer refresher
+        """
+        model = PeerCohortModel()
+        if model.train(conn):
+            model.save()
+        return model
@@ -1,14 +1,17 @@
 import pandas as pd
-from sklearn.cluster import KMeans
 from sklearn.ensemble import RandomForestRegressor
 from ..data.database import DataValidator
+from .cohort_model import PeerCohortModel
+from ..utils.profiler import profiled
 
 class EmissionsAnalyzer:
     def __init__(self):
-        self.cluster_model = KMeans(n_clusters=3)
+        # Trained offline over the whole user_data table; None until it has been built
+        self.cohort_model = PeerCohortModel.load()
         self.prediction_model = RandomForestRegressor()
         self.validator = DataValidator()
 
+    @profiled('analyze_trends')
     def analyze_trends(self, df):
         if len(df) < 2:
             return None
@@ -44,4 +47,12 @@ class EmissionsAnalyzer:
                                        self.prediction_model.feature_importances_))
             analysis_results['feature_importance'] = feature_importance
 
-        return analysis_results 
\ No newline at end of file
+        return analysis_results
+
+    def compare_to_peers(self, user_data, total_emissions, region=None):
+        """
+        Compare a user's total to their peer cohort, or None if no cohort model is trained
+        """
+        if self.cohort_model is None:
+            return None
+        return self.cohort_model.compare(user_data, total_emissions, region)
@@ -0,0 +1,185 @@
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional
+from sklearn.feature_extraction.text import TfidfVectorizer
+from .factor_registry import get_factor_registry
+from ..config.settings import ANSWER_BANK_PATH, APPROVED_ANSWERS_PATH, ANSWER_MATCH_THRESHOLD
+
+
+def _words(text: str) -> List[str]:
+    """
+    Word tokens with a plain plural 's' removed, so "flights" matches "flight"
+    """
+    return [word[:-1] if len(word) > 3 and word.endswith('s') and not word.endswith('ss') else word
+            for word in re.findall(r'\b\w\w+\b', text)]
+
+
+class AnswerIndex:
+    """
+    TF-IDF index over the curated answer bank plus previously approved chat answers.
+    Every question phrasing is a row; vectors are L2-normalised, so cosine similarity
+    to a new question is one sparse matrix-vector product, about a millisecond per
+    lookup. Function words are kept, since they separate "what is" from "why is".
+
+    The similarity is scaled by the cube of the question's coverage: the IDF-weighted
+    share of its words that occur in the index, with unknown words weighted as the
+    rarest known word. One unfamiliar subject ("bitcoin", "my cat's") is then enough
+    to push an otherwise similar question below threshold, so it goes to the LLM rather
+    than getting a confident answer to a different question. Only matches at or above
+    threshold are returned; check() shows where the threshold sits against the bank's
+    paraphrase and out-of-bank probes.
+    """
+    def __init__(self, bank_path: str = ANSWER_BANK_PATH, approved_path: str = APPROVED_ANSWERS_PATH,
+                 threshold: float = ANSWER_MATCH_THRESHOLD):
+        self.bank_path = bank_path
+        self.approved_path = approved_path
+        self.threshold = threshold
+        self.stats = {'lookups': 0, 'hits': 0, 'lookup_seconds': 0.0}
+        self._lock = threading.Lock()
+        self._approved = self._load(approved_path)
+        self._index = self._build(self._load_bank() + self._approved)
+
+    @staticmethod
+    def _load(path: str) -> List[Dict]:
+        try:
+            if not os.path.exists(path):
+                return []
+            with open(path) as f:
+                return json.load(f)['answers']
+        except Exception as e:
+            print(f"Error loading answers from {path}: {e}")
+            return []
+
+    def _load_bank(self) -> List[Dict]:
+        """
+        Curated answers with their {factor} placeholders filled from the emission factors
+        currently in effect, so quoted figures follow the registry
+        """
+        factors, _ = get_factor_registry().factors_for()
+        entries = []
+        for entry in self._load(self.bank_path):
+            try:
+                entries.append({**entry, 'answer': entry['answer'].format_map(factors)})
+            except (KeyError, ValueError, IndexError) as e:
+                print(f"Error rendering answer {entry.get('id')}: {e}")
+        return entries
+
+    @staticmethod
+    def _build(entries: List[Dict]):
+        questions, answers = [], []
+        for entry in entries:
+            for question in entry['questions']:
+                questions.append(question)
+                answers.append(entry)
+        if not questions:
+            return None
+
+        vectorizer = TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, tokenizer=_words, token_pattern=None)
+        matrix = vectorizer.fit_transform(questions)
+
+        # IDF of each known word; unknown words count as the rarest one
+        idf = {term: vectorizer.idf_[i] for term, i in vectorizer.vocabulary_.items() if ' ' not in term}
+        unknown_weight = vectorizer.idf_.max()
+        preprocess, tokenize = vectorizer.build_preprocessor(), vectorizer.build_tokenizer()
+
+        def coverage(question: str) -> float:
+            weights = [(idf.get(word, unknown_weight), word in idf) for word in tokenize(preprocess(question))]
+            total = sum(weight for weight, _ in weights)
+            return sum(weight for weight, known in weights if known) / total if total else 0.0
+
+        return vectorizer, matrix, answers, coverage
+
+    def _match(self, question: str) -> Optional[Dict]:
+        index = self._index
+        if index is None:
+            return None
+        vectorizer, matrix, answers, coverage = index
+        scores = (matrix @ vectorizer.transform([question]).T).toarray().ravel()
+        best = int(scores.argmax())
+        score = float(scores[best] * coverage(question) ** 3)
+        if score < self.threshold:
+            return None
+        return {'id': answers[best]['id'], 'answer': answers[best]['answer'], 'score': score}
+
+    def lookup(self, question: str) -> Optional[Dict]:
+        """
+        Return {'id', 'answer', 'score'} for the closest known question, or None below threshold
+        """
+        start = time.perf_counter()
+        match = self._match(question)
+
+        self.stats['lookups'] += 1
+        self.stats['hits'] += match is not None
+        self.stats['lookup_seconds'] += time.perf_counter() - start
+        return match
+
+    def approve(self, question: str, answer: str):
+        """
+        Add a reviewed answer, persist it to the approved answers file and rebuild the index
+        """
+        with self._lock:
+            self._approved.append({
+                'id': f"approved-{len(self._approved) + 1}",
+                'questions': [question],
+                'answer': answer,
+                'approved_at': datetime.now().isoformat()
+            })
+            try:
+                os.makedirs(os.path.dirname(self.approved_path), exist_ok=True)
+                tmp_path = f"{self.approved_path}.tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump({'answers': self._approved}, f, indent=2)
+                os.replace(tmp_path, self.approved_path)
+            except Exception as e:
+                print(f"Error saving approved answer: {e}")
+            # Swapped in one assignment so concurrent lookups see the old or new index, never a mix
+            self._index = self._build(self._load_bank() + self._approved)
+
+    def check(self) -> List[str]:
+        """
+        Confirm every curated phrasing matches its own answer, every paraphrase probe
+        in the bank file matches the answer it is listed under, and every out-of-bank
+        probe misses. Returns one message per failure.
+        """
+        try:
+            with open(self.bank_path) as f:
+                bank = json.load(f)
+        except Exception as e:
+            return [f"Error loading answers from {self.bank_path}: {e}"]
+
+        failures = []
+        for entry in bank['answers']:
+            for question in entry['questions']:
+                match = self._match(question)
+                if match is None or match['id'] != entry['id']:
+                    failures.append(f"{question!r} should match {entry['id']}, got {match and match['id']}")
+        for answer_id, questions in bank.get('paraphrases', {}).items():
+            for question in questions:
+                match = self._match(question)
+                if match is None or match['id'] != answer_id:
+                    failures.append(f"paraphrase {question!r} should match {answer_id}, "
+                                    f"got {match and match['id']}")
+        for question in bank.get('out_of_bank', []):
+            match = self._match(question)
+            if match is not None:
+                failures.append(f"{question!r} should miss, matched {match['id']} at {match['score']:.2f}")
+        return failures
+
+    def report(self) -> Dict[str, float]:
+        lookups = self.stats['lookups']
+        return {
+            'answer_lookups': lookups,
+            'answer_hits': self.stats['hits'],
+            'answer_hit_rate': self.stats['hits'] / lookups if lookups else 0.0,
+            'answer_lookup_ms': self.stats['lookup_seconds'] * 1000 / lookups if lookups else 0.0
+        }
+
+
+@lru_cache(maxsize=None)
+def get_answer_index() -> AnswerIndex:
+    return AnswerIndex()
@@ -0,0 +1,88 @@
+import pandas as pd
+import numpy as np
+from datetime import datetime
+from .factor_registry import FACTOR_KEYS, get_factor_registry
+from .timestamps import parse_local
+
+# Input columns and the emission factor each one is multiplied by
+ACTIVITY_COLUMNS = {
+    'car_km': 'car',
+    'bus_km': 'bus',
+    'train_km': 'train',
+    'electricity': 'electricity',
+    'meat_meals': 'meat',
+    'veg_meals': 'vegetarian',
+    'vegan_meals': 'vegan'
+}
+
+CATEGORY_COLUMNS = {
+    'transport': ['car_km', 'bus_km', 'train_km'],
+    'energy': ['electricity'],
+    'diet': ['meat_meals', 'veg_meals', 'vegan_meals']
+}
+
+
+class BatchEmissionsCalculator:
+    """
+    Vectorized counterpart of CarbonFootprintBot.calculate_emissions for many records at once
+    """
+    def __init__(self, registry=None, grid_store=None):
+        self.registry = registry or get_factor_registry()
+        # Optional GridIntensityStore; when set, electricity uses the hourly intensity as-of each row
+        self.grid_store = grid_store
+        # Rows dropped by validate_frame for a missing or unparseable timestamp
+        self.invalid_timestamps = 0
+
+    def validate_frame(self, df):
+        """
+        Apply the same rules as DataValidator.validate_input to a whole DataFrame:
+        non-numeric and negative values become 0.0. Timestamps may be in mixed formats;
+        rows whose timestamp is missing or unparseable are dropped, since the factor
+        set and retention date depend on it, and counted in invalid_timestamps.
+        Without a timestamp column every row is taken to be current.
+        """
+        df = df.rename(columns={'electricity_kwh': 'electricity'})
+        if 'timestamp' in df.columns:
+            timestamps = parse_local(df['timestamp'])
+            invalid = timestamps.isna()
+            if invalid.any():
+                self.invalid_timestamps += int(invalid.sum())
+                df, timestamps = df[~invalid], timestamps[~invalid]
+        else:
+            timestamps = pd.Timestamp(datetime.now())
+
+        valid = pd.DataFrame(index=df.index)
+        for col in ACTIVITY_COLUMNS:
+            if col in df.columns:
+                values = pd.to_numeric(df[col], errors='coerce').astype(float)
+                valid[col] = values.where(values >= 0, 0.0).fillna(0.0)
+            else:
+                valid[col] = 0.0
+        valid['timestamp'] = timestamps
+
+        return valid
+
+    def calculate(self, valid_df, region=None):
+        """
+        Add per-category and total emissions columns to a validated DataFrame, using
+        the factor set effective at each row's timestamp (and the stored hourly grid
+        intensity, if available). region may be a single region or a column of
+        regions aligned with the rows.
+        """
+        result = valid_df.copy()
+        factors, versions = self.registry.lookup(result['timestamp'], region)
+
+        if self.grid_store is not None and region is not None:
+            grid_intensity = self.grid_store.join_usage(result, region).to_numpy()
+            electricity_idx = FACTOR_KEYS.index('electricity')
+            factors[:, electricity_idx] = np.where(
+                np.isnan(grid_intensity), factors[:, electricity_idx], grid_intensity
+            )
+
+        for category, columns in CATEGORY_COLUMNS.items():
+            factor_idx = [FACTOR_KEYS.index(ACTIVITY_COLUMNS[col]) for col in columns]
+            result[category] = (result[columns].to_numpy() * factors[:, factor_idx]).sum(axis=1)
+
+        result['total_emissions'] = result['transport'] + result['energy'] + result['diet']
+        result['factor_version'] = versions
+        return result
@@ -0,0 +1,61 @@
+import threading
+import time
+from functools import lru_cache
+from ..config.settings import CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT
+
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream after failure_threshold consecutive failures. While
+    open, allow() returns False so callers fail fast to their defaults; after
+    reset_timeout seconds a single trial request is let through and its outcome
+    closes or re-opens the circuit.
+    """
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = CIRCUIT_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    print(f"Circuit for {self.name} opened after {self.failures} failures")
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+@lru_cache(maxsize=None)
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """Process-wide breaker per upstream, shared by every client instance"""
+    return CircuitBreaker(name)
@@ -0,0 +1,119 @@
+import math
+import re
+from typing import Dict, List, Optional
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional, fall back to a character estimate
+    tiktoken = None
+
+
+class TokenCounter:
+    """
+    Count tokens with tiktoken when it is installed, otherwise estimate ~4 characters per token
+    """
+    def __init__(self, model: str = "gpt-3.5-turbo"):
+        self.encoding = None
+        if tiktoken is not None:
+            try:
+                self.encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self.encoding = tiktoken.get_encoding("cl100k_base")
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
+        return math.ceil(len(text) / 4)
+
+    def count_messages(self, messages: List[Dict]) -> int:
+        # Each chat message carries ~4 tokens of framing, plus 3 to prime the reply
+        return sum(self.count(m["content"]) + 4 for m in messages) + 3
+
+
+class ConversationMemory:
+    """
+    Token-budgeted chat history: recent turns are kept verbatim and older
+    turns are folded into a running summary
+    """
+    def __init__(self, token_budget: int = 1500, recent_token_budget: int = 600,
+                 summary_token_budget: int = 250, model: str = "gpt-3.5-turbo"):
+        self.token_budget = token_budget
+        self.recent_token_budget = recent_token_budget
+        self.summary_token_budget = summary_token_budget
+        self.counter = TokenCounter(model)
+        self.summary_lines: List[str] = []
+        self.recent: List[Dict] = []
+        self.stats = {
+            'calls': 0,
+            'last_prompt_tokens': 0,
+            'total_prompt_tokens': 0,
+            'last_reported_prompt_tokens': None
+        }
+
+    @staticmethod
+    def _first_sentence(text: str, max_chars: int = 160) -> str:
+        text = " ".join(text.split())
+        sentence = re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0]
+        if len(sentence) > max_chars:
+            sentence = sentence[:max_chars].rstrip() + "..."
+        return sentence
+
+    @property
+    def summary(self) -> str:
+        return "\n".join(self.summary_lines)
+
+    def _fold_into_summary(self, message: Dict):
+        speaker = "User" if message["role"] == "user" else "Assistant"
+        self.summary_lines.append(f"- {speaker}: {self._first_sentence(message['content'])}")
+
+        # Keep the summary itself within budget by dropping its oldest lines
+        while len(self.summary_lines) > 1 and self.counter.count(self.summary) > self.summary_token_budget:
+            self.summary_lines.pop(0)
+
+    def add_exchange(self, user_message: str, assistant_message: str):
+        """
+        Record a completed exchange and compact older turns into the summary
+        """
+        self.recent.append({"role": "user", "content": user_message})
+        self.recent.append({"role": "assistant", "content": assistant_message})
+
+        while len(self.recent) > 2 and self.counter.count_messages(self.recent) > self.recent_token_budget:
+            self._fold_into_summary(self.recent.pop(0))
+
+    def build_messages(self, system_prompt: str, user_content: str) -> List[Dict]:
+        """
+        Assemble the prompt for the next call, dropping the oldest verbatim turns
+        if the whole prompt would exceed the token budget
+        """
+        recent = list(self.recent)
+        while True:
+            messages = [{"role": "system", "content": system_prompt}]
+            if self.summary_lines:
+                messages.append({
+                    "role": "system",
+                    "content": f"Summary of earlier conversation:\n{self.summary}"
+                })
+            messages.extend(recent)
+            messages.append({"role": "user", "content": user_content})
+
+            prompt_tokens = self.counter.count_messages(messages)
+            if prompt_tokens <= self.token_budget or not recent:
+                break
+            recent.pop(0)
+
+        self.stats['calls'] += 1
+        self.stats['last_prompt_tokens'] = prompt_tokens
+        self.stats['total_prompt_tokens'] += prompt_tokens
+        return messages
+
+    def record_usage(self, prompt_tokens: Optional[int]):
+        """
+        Store the prompt token count reported by the API for the last call
+        """
+        self.stats['last_reported_prompt_tokens'] = prompt_tokens
+
+    def clear(self):
+        self.summary_lines = []
+        self.recent = []
@@ -1,7 +1,14 @@
 import requests
 from datetime import datetime
 import pandas as pd
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+from .factor_registry import get_factor_registry
+from .circuit_breaker import get_circuit_breaker
+from ..config.settings import EXTERNAL_API_TIMEOUT
+
+# A failed request or an unusable body (bad JSON, wrong shape, non-numeric value) counts
+# as a failure for the circuit breaker, so a half-open trial always settles
+UPSTREAM_ERRORS = (requests.RequestException, ValueError, TypeError, AttributeError)
 
 class EmissionsDataAPI:
     def __init__(self):
@@ -15,11 +22,18 @@ class EmissionsDataAPI:
         # Carbon Interface API (provides real-time carbon intensity data)
         self.carbon_interface_key = "YOUR_CARBON_INTERFACE_KEY"
         self.carbon_interface_url = "https://www.carboninterface.com/api/v1"
+        
+        # Every request is bounded by a timeout and fails fast while its upstream is down
+        self.timeout = EXTERNAL_API_TIMEOUT
+        self.epa_breaker = get_circuit_breaker('epa')
+        self.carbon_interface_breaker = get_circuit_breaker('carbon_interface')
 
     def get_regional_emissions_data(self, location: str) -> Dict[str, Any]:
         """
         Get real-time regional emissions data from EPA
         """
+        if not self.epa_breaker.allow():
+            return {}
         try:
             endpoint = f"{self.epa_base_url}/facilities"
             params = {
@@ -27,17 +41,48 @@ class EmissionsDataAPI:
                 "year": datetime.now().year,
                 "api_key": self.epa_api_key
             }
-            response = requests.get(endpoint, params=params)
+            response = requests.get(endpoint, params=params, timeout=self.timeout)
             response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            data = response.json()
+            if not isinstance(data, dict):
+                raise TypeError(f"expected a JSON object, got {type(data).__name__}")
+            self.epa_breaker.record_success()
+            return data
+        except UPSTREAM_ERRORS as e:
+            self.epa_breaker.record_failure()
             print(f"Error fetching EPA data: {e}")
             return {}
 
-    def get_grid_carbon_intensity(self, country_code: str, region: str) -> float:
+    def stream_regional_emissions_data(self, location: str) -> Optional[requests.Response]:
+        """
+        Open a streaming request for EPA facility data so large payloads can be parsed incrementally
+        """
+        if not self.epa_breaker.allow():
+            return None
+        try:
+            endpoint = f"{self.epa_base_url}/facilities"
+            params = {
+                "state": location,
+                "year": datetime.now().year,
+                "api_key": self.epa_api_key
+            }
+            response = requests.get(endpoint, params=params, stream=True, timeout=self.timeout)
+            response.raise_for_status()
+            response.raw.decode_content = True
+            self.epa_breaker.record_success()
+            return response
+        except UPSTREAM_ERRORS as e:
+            self.epa_breaker.record_failure()
+            print(f"Error fetching EPA data: {e}")
+            return None
+
+    def get_grid_carbon_intensity(self, country_code: str, region: str) -> Optional[float]:
         """
-        Get real-time electricity grid carbon intensity from Carbon Interface API
+        Get real-time electricity grid carbon intensity (kg CO2/kWh) from Carbon Interface API.
+        Returns None when the upstream is unavailable so callers can use a default factor.
         """
+        if not self.carbon_interface_breaker.allow():
+            return None
         try:
             headers = {
                 "Authorization": f"Bearer {self.carbon_interface_key}",
@@ -48,32 +93,61 @@ class EmissionsDataAPI:
                 "country": country_code,
                 "region": region
             }
-            response = requests.get(endpoint, headers=headers, params=params)
+            response = requests.get(endpoint, headers=headers, params=params, timeout=self.timeout)
             response.raise_for_status()
-            data = response.json()
-            return data.get('carbon_intensity', 0.0)  # gCO2/kWh
-        except requests.RequestException as e:
+            intensity = response.json().get('carbon_intensity')  # gCO2/kWh
+            intensity = float(intensity) / 1000.0 if intensity is not None else None
+            self.carbon_interface_breaker.record_success()
+            return intensity
+        except UPSTREAM_ERRORS as e:
+            self.carbon_interface_breaker.record_failure()
             print(f"Error fetching grid intensity data: {e}")
-            return 0.0
+            return None
 
-    def get_ipcc_emissions_factors(self) -> Dict[str, float]:
+    def get_grid_intensity_history(self, country_code: str, region: str,
+                                   start: datetime, end: datetime) -> List[Dict[str, Any]]:
         """
-        Get hardcoded emissions factors
+        Get hourly grid carbon intensity for a time window from Carbon Interface API
         """
-        return {
-            'car': 0.12,        # kg CO2 per km
-            'bus': 0.089,       # kg CO2 per km
-            'train': 0.041,     # kg CO2 per km
-            'electricity': 0.233,  # kg CO2 per kWh
-            'meat': 2.5,        # kg CO2 per meal
-            'vegetarian': 1.0,  # kg CO2 per meal
-            'vegan': 0.5        # kg CO2 per meal
-        }
+        if not self.carbon_interface_breaker.allow():
+            return []
+        try:
+            headers = {
+                "Authorization": f"Bearer {self.carbon_interface_key}",
+                "Content-Type": "application/json"
+            }
+            endpoint = f"{self.carbon_interface_url}/grid_intensity/history"
+            params = {
+                "country": country_code,
+                "region": region,
+                "start": start.isoformat(),
+                "end": end.isoformat()
+            }
+            response = requests.get(endpoint, headers=headers, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json().get('data', [])  # [{'datetime': ..., 'carbon_intensity': gCO2/kWh}]
+            if not isinstance(data, list):
+                raise TypeError(f"expected a list of hours, got {type(data).__name__}")
+            self.carbon_interface_breaker.record_success()
+            return data
+        except UPSTREAM_ERRORS as e:
+            self.carbon_interface_breaker.record_failure()
+            print(f"Error fetching grid intensity history: {e}")
+            return []
+
+    def get_ipcc_emissions_factors(self, region: Optional[str] = None) -> Dict[str, float]:
+        """
+        Get the emissions factors currently in effect from the local factor registry
+        """
+        factors, _ = get_factor_registry().factors_for(region)
+        return factors
 
     def get_local_air_quality(self, latitude: float, longitude: float) -> Dict[str, Any]:
         """
         Get real-time air quality data from EPA's AirNow API
         """
+        if not self.epa_breaker.allow():
+            return {}
         try:
             endpoint = f"{self.epa_base_url}/airnow"
             params = {
@@ -81,9 +155,14 @@ class EmissionsDataAPI:
                 "longitude": longitude,
                 "api_key": self.epa_api_key
             }
-            response = requests.get(endpoint, params=params)
+            response = requests.get(endpoint, params=params, timeout=self.timeout)
             response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            data = response.json()
+            if not isinstance(data, dict):
+                raise TypeError(f"expected a JSON object, got {type(data).__name__}")
+            self.epa_breaker.record_success()
+            return data
+        except UPSTREAM_ERRORS as e:
+            self.epa_breaker.record_failure()
             print(f"Error fetching air quality data: {e}")
             return {} 
\ No newline at end of file
@@ -0,0 +1,150 @@
+import hashlib
+from bisect import bisect_right
+import json
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+from ..config.settings import EMISSION_FACTORS, EMISSION_FACTORS_PATH
+
+# Column order of the compiled factor matrices
+FACTOR_KEYS = ['car', 'bus', 'train', 'electricity', 'meat', 'vegetarian', 'vegan']
+DEFAULT_REGION = 'default'
+
+
+class EmissionFactorRegistry:
+    """
+    Emission factor sets keyed by region and effective date. A region's sets override
+    individual factors of the default set in effect at the same time.
+    Each region is compiled into a sorted array of effective dates and a matching
+    factor matrix, so looking up many timestamps is a single np.searchsorted.
+    """
+    def __init__(self, path: str = EMISSION_FACTORS_PATH):
+        self.path = path
+        self._regions = {}
+        self._sets_by_version = {}
+        self._compile(self._load_factor_sets())
+        # Identifies this exact collection of factor sets, e.g. for recompute checkpoints
+        self.fingerprint = hashlib.sha1(
+            ','.join(sorted(self._sets_by_version)).encode()
+        ).hexdigest()[:12]
+
+    def _load_factor_sets(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)['factor_sets']
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error loading emission factors from {self.path}: {e}")
+            return []
+
+    def _compile(self, factor_sets):
+        if not any(s.get('region', DEFAULT_REGION) == DEFAULT_REGION for s in factor_sets):
+            factor_sets = [*factor_sets, {
+                'version': 'settings',
+                'region': DEFAULT_REGION,
+                'effective_date': '1970-01-01',
+                'factors': EMISSION_FACTORS
+            }]
+
+        grouped = {}
+        for factor_set in factor_sets:
+            grouped.setdefault(factor_set.get('region', DEFAULT_REGION), []).append(
+                (np.datetime64(factor_set['effective_date'], 'ns'), factor_set['version'], factor_set['factors'])
+            )
+        for entries in grouped.values():
+            entries.sort(key=lambda entry: entry[0])
+
+        # Default sets: missing factors inherit the settings defaults
+        default = [(date, version, {**EMISSION_FACTORS, **factors})
+                   for date, version, factors in grouped.pop(DEFAULT_REGION)]
+        for _, version, factors in default:
+            self._sets_by_version[version] = factors
+        self._regions[DEFAULT_REGION] = self._arrays(default)
+
+        # Region sets overlay the default set in effect on the same date, so a default revision
+        # reaches every factor a region doesn't override. A region's timeline has an entry at
+        # every default and region effective date; dates before its first set use the default alone.
+        default_dates = [entry[0] for entry in default]
+        for region, entries in grouped.items():
+            region_dates = [entry[0] for entry in entries]
+            timeline = []
+            for date in sorted(set(default_dates) | set(region_dates)):
+                _, base_version, base = default[max(bisect_right(default_dates, date) - 1, 0)]
+                position = bisect_right(region_dates, date) - 1
+                if position < 0:
+                    timeline.append((date, base_version, base))
+                    continue
+                _, version, overrides = entries[position]
+                # Sets that don't override every factor are labelled with the default set they extend
+                if not set(FACTOR_KEYS) <= set(overrides):
+                    # The bare version keeps its earlier meaning (overlay on settings) for rows stamped with it
+                    self._sets_by_version.setdefault(version, {**EMISSION_FACTORS, **overrides})
+                    version = f"{version}+{base_version}"
+                factors = {**base, **overrides}
+                self._sets_by_version[version] = factors
+                timeline.append((date, version, factors))
+            self._regions[region] = self._arrays(timeline)
+
+    @staticmethod
+    def _arrays(timeline):
+        return (
+            np.array([entry[0] for entry in timeline], dtype='datetime64[ns]'),
+            np.array([[entry[2][key] for key in FACTOR_KEYS] for entry in timeline], dtype=float),
+            np.array([entry[1] for entry in timeline], dtype=object)
+        )
+
+    def _region_arrays(self, region: Optional[str]):
+        return self._regions.get(region) or self._regions[DEFAULT_REGION]
+
+    def _indices(self, dates, timestamps):
+        # Index of the last set effective at or before each timestamp; earlier timestamps use the first set
+        indices = np.searchsorted(dates, timestamps, side='right') - 1
+        return np.clip(indices, 0, len(dates) - 1)
+
+    def factors_for(self, region: Optional[str] = None, when=None) -> Tuple[Dict[str, float], str]:
+        """
+        Return (factors, version) effective for a region at a point in time (default: now)
+        """
+        dates, _, versions = self._region_arrays(region)
+        when = (pd.Timestamp(when) if when is not None else pd.Timestamp.now()).to_datetime64()
+        version = versions[self._indices(dates, when)]
+        return self._sets_by_version[version], version
+
+    def factors_by_version(self, version: str) -> Optional[Dict[str, float]]:
+        """
+        Return the factors of a stored factor-set version, or None if it is no longer defined
+        """
+        return self._sets_by_version.get(version)
+
+    def lookup(self, timestamps, regions=None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorized lookup for many timestamps. Returns a (n, len(FACTOR_KEYS)) factor
+        matrix and an array of factor-set versions. regions may be a single region
+        or an array aligned with timestamps.
+        """
+        timestamps = pd.to_datetime(pd.Series(timestamps)).to_numpy(dtype='datetime64[ns]')
+        n = len(timestamps)
+        factors = np.empty((n, len(FACTOR_KEYS)), dtype=float)
+        versions = np.empty(n, dtype=object)
+
+        if regions is None or np.isscalar(regions):
+            groups = {regions: np.arange(n)}
+        else:
+            region_series = pd.Series(np.asarray(regions, dtype=object))
+            groups = region_series.groupby(region_series.fillna(DEFAULT_REGION)).indices
+
+        for region, positions in groups.items():
+            dates, matrix, region_versions = self._region_arrays(region)
+            indices = self._indices(dates, timestamps[positions])
+            factors[positions] = matrix[indices]
+            versions[positions] = region_versions[indices]
+
+        return factors, versions
+
+
+@lru_cache(maxsize=None)
+def get_factor_registry(path: str = EMISSION_FACTORS_PATH) -> EmissionFactorRegistry:
+    """
+    Process-wide registry, loaded from disk once per path
+    """
+    return EmissionFactorRegistry(path)
@@ -1,11 +1,12 @@
 from dataclasses import dataclass
 from typing import Dict
-import openai
-from ..config.settings import OPENAI_API_KEY
+from .openai_client import get_openai_scheduler, DeadlineExceeded, PRIORITY_DEFAULT
+from .recommendation_engine import RecommendationEngine
+from ..data.database import DataValidator
 
 class AIInsightsEngine:
     def __init__(self):
-        self.client = openai.OpenAI(api_key=OPENAI_API_KEY)
+        self.scheduler = get_openai_scheduler()
 
     def generate_ai_insights(self, user_data: Dict) -> str:
         # Convert string values to float before formatting
@@ -40,7 +41,8 @@ class AIInsightsEngine:
             Format the response with clear sections and bullet points.
             """
 
-            response = self.client.chat.completions.create(
+            response = self.scheduler.chat_completion(
+                priority=PRIORITY_DEFAULT,
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are a knowledgeable sustainability expert providing detailed, personalized carbon footprint reduction advice."},
@@ -52,31 +54,12 @@ class AIInsightsEngine:
             
             return response.choices[0].message.content
             
-        except (ValueError, TypeError) as e:
+        except (ValueError, TypeError, DeadlineExceeded) as e:
             print(f"Error processing data: {e}")
             return self._generate_fallback_insights(user_data)
 
     def _generate_fallback_insights(self, user_data: Dict) -> str:
-        """Generate basic insights if AI generation fails"""
-        insights = "\n=== Carbon Footprint Insights ===\n"
-        insights += "\nUnable to generate AI insights. Here are some general recommendations:\n"
-        
-        if user_data['car_km'] > 0:
-            insights += "\n🚗 Transportation:\n"
-            insights += "- Consider using public transportation more frequently\n"
-            insights += "- Look into carpooling options\n"
-            insights += "- Try walking or cycling for short trips\n"
-        
-        if user_data['electricity'] > 0:
-            insights += "\n⚡ Energy Usage:\n"
-            insights += "- Switch to energy-efficient appliances\n"
-            insights += "- Use LED lighting\n"
-            insights += "- Optimize heating and cooling\n"
-        
-        if user_data['meat_meals'] > 0:
-            insights += "\n🥗 Diet:\n"
-            insights += "- Try incorporating more plant-based meals\n"
-            insights += "- Start with one meatless day per week\n"
-            insights += "- Choose local and seasonal products\n"
-        
-        return insights 
\ No newline at end of file
+        """Generate rule-based insights if AI generation fails"""
+        valid_data = DataValidator.validate_input(user_data)
+        engine = RecommendationEngine()
+        return engine.format(engine.generate(valid_data), valid_data.get('total_emissions'))
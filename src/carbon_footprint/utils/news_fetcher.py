@@ -1,17 +1,19 @@
 import requests
 from typing import List, Dict
-import openai
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 import os
 from dotenv import load_dotenv
 from .news_cache import NewsCache
+from .openai_client import get_openai_scheduler, PRIORITY_BACKGROUND
+from ..config.settings import OPENAI_MAX_CONCURRENCY
 
 load_dotenv()
 
 class NewsFetcher:
     def __init__(self):
         self.news_api_key = os.getenv('NEWS_API_KEY')
-        self.openai_client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        self.scheduler = get_openai_scheduler()
         self.base_url = "https://www.iqair.com/newsroom"
         self.cache = NewsCache()
 
@@ -66,7 +68,8 @@ class NewsFetcher:
             Content: {article['description']}
             """
 
-            response = self.openai_client.chat.completions.create(
+            response = self.scheduler.chat_completion(
+                priority=PRIORITY_BACKGROUND,
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are a sustainability news expert. Summarize key initiatives and impacts."},
@@ -85,10 +88,12 @@ class NewsFetcher:
         """
         Process and summarize each article
         """
+        # Summaries run concurrently; the shared scheduler keeps them within rate limits
+        with ThreadPoolExecutor(max_workers=OPENAI_MAX_CONCURRENCY) as executor:
+            summaries = list(executor.map(self.summarize_article, articles))
+
         processed_articles = []
-        
-        for article in articles:
-            summary = self.summarize_article(article)
+        for article, summary in zip(articles, summaries):
             processed_articles.append({
                 'title': article['title'],
                 'summary': summary,
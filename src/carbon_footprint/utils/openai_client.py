@@ -0,0 +1,209 @@
+import heapq
+import itertools
+import math
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Optional
+import httpx
+import openai
+from .profiler import profiled
+from ..config.settings import (
+    OPENAI_API_KEY, OPENAI_MAX_CONCURRENCY, OPENAI_REQUESTS_PER_MINUTE,
+    OPENAI_TOKENS_PER_MINUTE, OPENAI_REQUEST_TIMEOUT
+)
+
+# Lower runs first
+PRIORITY_INTERACTIVE = 0    # chat replies a user is waiting on
+PRIORITY_DEFAULT = 5        # recommendations and insights
+PRIORITY_BACKGROUND = 10    # news summaries and other batch work
+
+MAX_RATE_LIMIT_RETRIES = 3
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a request cannot be started or finished before its deadline"""
+
+
+def _parse_reset(value: Optional[str]) -> Optional[float]:
+    """
+    Parse OpenAI reset durations such as '1s', '6m0s' or '20ms' into seconds
+    """
+    if not value:
+        return None
+    units = {'h': 3600, 'm': 60, 's': 1, 'ms': 0.001}
+    parts = re.findall(r'([\d.]+)(ms|h|m|s)', value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * units[unit] for amount, unit in parts)
+
+
+class TokenBucket:
+    """
+    Refills continuously at limit-per-minute, corrected by the API's rate-limit headers
+    """
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        self.tokens -= amount
+
+    def sync(self, limit: Optional[str], remaining: Optional[str], reset: Optional[str]):
+        now = time.monotonic()
+        self._refill(now)
+        if limit:
+            self.capacity = float(limit)
+            self.rate = self.capacity / 60.0
+        if remaining is not None:
+            # The server's count includes other clients sharing the key
+            self.tokens = min(self.tokens, float(remaining))
+            reset_seconds = _parse_reset(reset)
+            if reset_seconds and self.tokens < self.capacity:
+                self.rate = max(self.rate, (self.capacity - self.tokens) / reset_seconds)
+
+
+class OpenAIScheduler:
+    """
+    Admits chat completion requests in priority order, within a concurrency limit and
+    request/token buckets, and pauses everyone on a 429 instead of letting each
+    caller retry on its own.
+    """
+    def __init__(self, client: openai.OpenAI, max_concurrency: int = OPENAI_MAX_CONCURRENCY,
+                 requests_per_minute: float = OPENAI_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = OPENAI_TOKENS_PER_MINUTE):
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._active = 0
+        self._paused_until = 0.0
+        self.stats = {'requests': 0, 'rate_limited': 0, 'deadline_exceeded': 0}
+
+    @staticmethod
+    def _estimate_tokens(kwargs) -> int:
+        prompt_chars = sum(len(m.get('content') or '') for m in kwargs.get('messages', []))
+        return math.ceil(prompt_chars / 4) + kwargs.get('max_tokens', 256)
+
+    def _acquire(self, priority: int, tokens: int, deadline: float):
+        ticket = (priority, next(self._sequence))
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    if now >= deadline:
+                        raise DeadlineExceeded("Deadline passed while waiting for an OpenAI slot")
+
+                    wait = deadline - now
+                    if self._waiting[0] == ticket and self._active < self.max_concurrency:
+                        wait = max(self._paused_until - now,
+                                   self.request_bucket.wait_time(1, now),
+                                   self.token_bucket.wait_time(tokens, now))
+                        if wait <= 0:
+                            heapq.heappop(self._waiting)
+                            self.request_bucket.consume(1)
+                            self.token_bucket.consume(tokens)
+                            self._active += 1
+                            # The next ticket may now be admissible too
+                            self._cond.notify_all()
+                            return
+                    self._cond.wait(min(wait, deadline - now))
+            except BaseException:
+                if ticket in self._waiting:
+                    self._waiting.remove(ticket)
+                    heapq.heapify(self._waiting)
+                    self._cond.notify_all()
+                raise
+
+    def _release(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def _sync_limits(self, headers):
+        with self._cond:
+            self.request_bucket.sync(headers.get('x-ratelimit-limit-requests'),
+                                     headers.get('x-ratelimit-remaining-requests'),
+                                     headers.get('x-ratelimit-reset-requests'))
+            self.token_bucket.sync(headers.get('x-ratelimit-limit-tokens'),
+                                   headers.get('x-ratelimit-remaining-tokens'),
+                                   headers.get('x-ratelimit-reset-tokens'))
+
+    def _pause(self, seconds: float):
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self.stats['rate_limited'] += 1
+
+    @profiled('chat_completion')
+    def chat_completion(self, priority: int = PRIORITY_DEFAULT,
+                        timeout: Optional[float] = OPENAI_REQUEST_TIMEOUT, **kwargs):
+        """
+        Run client.chat.completions.create(**kwargs) under the scheduler. timeout is the
+        overall deadline in seconds, covering queueing, retries and the request itself.
+        """
+        deadline = time.monotonic() + (timeout if timeout is not None else math.inf)
+        tokens = self._estimate_tokens(kwargs)
+
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            try:
+                self._acquire(priority, tokens, deadline)
+            except DeadlineExceeded:
+                self.stats['deadline_exceeded'] += 1
+                raise
+            try:
+                remaining = deadline - time.monotonic()
+                raw = self.client.chat.completions.with_raw_response.create(
+                    timeout=remaining if math.isfinite(remaining) else None, **kwargs
+                )
+                self._sync_limits(raw.headers)
+                self.stats['requests'] += 1
+                return raw.parse()
+            except openai.RateLimitError as e:
+                headers = e.response.headers if e.response is not None else {}
+                retry_after = _parse_reset(headers.get('retry-after')) or 2.0 ** attempt
+                self._sync_limits(headers)
+                self._pause(retry_after)
+                if attempt == MAX_RATE_LIMIT_RETRIES:
+                    raise
+            except openai.APITimeoutError:
+                self.stats['deadline_exceeded'] += 1
+                raise DeadlineExceeded("OpenAI request did not finish before its deadline")
+            finally:
+                self._release()
+
+
+@lru_cache(maxsize=None)
+def get_openai_client() -> openai.OpenAI:
+    """
+    Process-wide client; its HTTP connection pool is reused by every caller
+    """
+    http_client = httpx.Client(
+        limits=httpx.Limits(max_connections=OPENAI_MAX_CONCURRENCY * 2,
+                            max_keepalive_connections=OPENAI_MAX_CONCURRENCY)
+    )
+    # Retries are handled by the scheduler so 429s back off globally
+    return openai.OpenAI(api_key=OPENAI_API_KEY, http_client=http_client, max_retries=0)
+
+
+@lru_cache(maxsize=None)
+def get_openai_scheduler() -> OpenAIScheduler:
+    return OpenAIScheduler(get_openai_client())
@@ -0,0 +1,233 @@
+import cProfile
+import functools
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+from ..config.settings import (
+    PROFILE_ENABLED, PROFILE_MODE, PROFILE_SAMPLE_RATE, PROFILE_INTERVAL_MS,
+    PROFILE_TOP_ALLOCATIONS, PROFILE_TRACEMALLOC_FRAMES, PROFILE_OUTPUT_DIR
+)
+
+PROFILE_MODES = ('sampling', 'cprofile')
+
+# tracemalloc is process-wide: it is started by the first profiled region and stopped by the
+# last, and left alone if something else was already tracing
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_owned = False
+
+
+def _start_tracing(frames: int):
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        if _tracing_users == 0:
+            _tracing_owned = not tracemalloc.is_tracing()
+            if _tracing_owned:
+                tracemalloc.start(frames)
+        _tracing_users += 1
+
+
+def _stop_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_owned and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack on a background thread and counts folded
+    stacks ("outer;inner count" lines), the input format of flamegraph.pl and speedscope.
+    """
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def _fold(frame) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[self._fold(frame)] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class Profiler:
+    """
+    Profiles named regions (request handlers, chart rendering, LLM calls) for a
+    sampled share of requests. Each profiled call writes a CPU profile and the
+    top-N allocations made while it ran to output_dir. Allocations are traced
+    tracemalloc_frames deep (0 skips them), since tracing slows every allocation and
+    shows up in the CPU profile. Only one region is profiled
+    at a time, since cProfile and tracemalloc are process-wide; nested or
+    concurrent regions run unprofiled while another is being captured.
+    """
+    def __init__(self, enabled: bool = PROFILE_ENABLED, mode: str = PROFILE_MODE,
+                 sample_rate: float = PROFILE_SAMPLE_RATE, interval_ms: float = PROFILE_INTERVAL_MS,
+                 top_n: int = PROFILE_TOP_ALLOCATIONS, output_dir: str = PROFILE_OUTPUT_DIR,
+                 tracemalloc_frames: int = PROFILE_TRACEMALLOC_FRAMES):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode {mode!r}, expected one of {PROFILE_MODES}")
+        self.enabled = enabled
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.interval = interval_ms / 1000
+        self.top_n = top_n
+        self.output_dir = output_dir
+        self.tracemalloc_frames = tracemalloc_frames
+        self._active = threading.Lock()
+
+    @contextmanager
+    def profile(self, name: str):
+        if not self.enabled or random.random() >= self.sample_rate or not self._active.acquire(blocking=False):
+            yield
+            return
+
+        try:
+            before, collector = self._start()
+        except Exception as e:
+            print(f"Error starting profile for {name}: {e}")
+            self._active.release()
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._finish(name, time.perf_counter() - start, before, collector)
+
+    def _start(self):
+        if not self.tracemalloc_frames:
+            return None, self._start_collector()
+        _start_tracing(self.tracemalloc_frames)
+        try:
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot()
+            collector = self._start_collector()
+        except Exception:
+            _stop_tracing()
+            raise
+        return before, collector
+
+    def _start_collector(self):
+        if self.mode == 'cprofile':
+            collector = cProfile.Profile()
+            collector.enable()
+        else:
+            collector = StackSampler(threading.get_ident(), self.interval)
+            collector.start()
+        return collector
+
+    def _finish(self, name: str, elapsed: float, before, collector):
+        """
+        Stop collecting and write the profile. Errors are printed, never raised, so
+        profiling can't fail the profiled call.
+        """
+        allocations, peak = None, None
+        try:
+            if self.mode == 'cprofile':
+                collector.disable()
+            else:
+                collector.stop()
+            if before is not None:
+                after = tracemalloc.take_snapshot()
+                peak = tracemalloc.get_traced_memory()[1]
+                allocations = after.compare_to(before, 'lineno')
+        except Exception as e:
+            print(f"Error collecting profile for {name}: {e}")
+            return
+        finally:
+            if before is not None:
+                _stop_tracing()
+            self._active.release()
+        self._write(name, elapsed, collector, allocations, peak)
+
+    def _write(self, name: str, elapsed: float, collector, allocations, peak: int):
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            base = os.path.join(self.output_dir,
+                                f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{os.getpid()}-{name}")
+
+            if self.mode == 'cprofile':
+                cpu_path = f"{base}.prof"
+                collector.dump_stats(cpu_path)
+            else:
+                cpu_path = f"{base}.folded"
+                with open(cpu_path, 'w') as f:
+                    f.write(collector.folded())
+
+            if allocations is not None:
+                with open(f"{base}.alloc.txt", 'w') as f:
+                    f.write(f"{name}: {elapsed * 1000:.1f} ms, peak traced memory {peak / 1024:.1f} KiB\n")
+                    f.write(f"Top {self.top_n} allocations by size:\n")
+                    for stat in allocations[:self.top_n]:
+                        f.write(f"{stat}\n")
+
+            print(f"Profiled {name} in {elapsed * 1000:.1f} ms -> {cpu_path}")
+        except Exception as e:
+            print(f"Error writing profile for {name}: {e}")
+
+
+_profiler: Optional[Profiler] = None
+
+
+def get_profiler() -> Profiler:
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler()
+    return _profiler
+
+
+def configure_profiler(**kwargs) -> Profiler:
+    """
+    Replace the process-wide profiler, e.g. from command-line options
+    """
+    global _profiler
+    _profiler = Profiler(**kwargs)
+    return _profiler
+
+
+def profiled(name: str):
+    """
+    Decorator that profiles calls with whichever profiler is configured when the call
+    is made, so it can be applied at import time and enabled later
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = get_profiler()
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+            with profiler.profile(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
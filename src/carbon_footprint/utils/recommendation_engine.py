@@ -0,0 +1,97 @@
+from typing import Dict, List, Optional
+from .factor_registry import get_factor_registry
+
+CATEGORY_ICONS = {'transport': '🚗', 'energy': '⚡', 'diet': '🥗'}
+
+
+class RecommendationEngine:
+    """
+    Rule-based recommendations with savings computed from the user's own inputs and
+    the emission factors in effect, ranked by impact. Pure arithmetic, so it returns
+    in well under a millisecond and works without network access.
+    """
+    # Share of an activity a rule assumes is realistically changed
+    COMMUTE_SHIFT_SHARE = 0.5
+    EFFICIENCY_SAVING_SHARE = 0.1
+    MIN_DAILY_SAVING = 0.01
+
+    def __init__(self, registry=None):
+        self.registry = registry or get_factor_registry()
+
+    def _candidates(self, data: Dict[str, float], f: Dict[str, float], grid_intensity: float):
+        car_km = data.get('car_km', 0.0)
+        meat_meals = data.get('meat_meals', 0.0)
+        veg_meals = data.get('veg_meals', 0.0)
+        electricity = data.get('electricity', 0.0)
+        shift_km = car_km * self.COMMUTE_SHIFT_SHARE
+
+        yield ('transport', 'Medium', 'Short-term',
+               f"Take the train for {shift_km:.0f} of your {car_km:.0f} daily car km",
+               shift_km * (f['car'] - f['train']))
+        yield ('transport', 'Easy', 'Immediate',
+               f"Take the bus for {shift_km:.0f} of your {car_km:.0f} daily car km",
+               shift_km * (f['car'] - f['bus']))
+        yield ('transport', 'Medium', 'Short-term',
+               f"Carpool with one other person for {shift_km:.0f} km a day",
+               shift_km * f['car'] / 2)
+        yield ('diet', 'Easy', 'Immediate',
+               "Swap one meat meal a day for a vegetarian one",
+               min(1.0, meat_meals) * (f['meat'] - f['vegetarian']))
+        yield ('diet', 'Challenging', 'Long-term',
+               f"Replace all {meat_meals:.0f} daily meat meals with vegan meals",
+               meat_meals * (f['meat'] - f['vegan']))
+        yield ('diet', 'Medium', 'Short-term',
+               f"Make your {veg_meals:.0f} daily vegetarian meals vegan",
+               veg_meals * (f['vegetarian'] - f['vegan']))
+        yield ('energy', 'Easy', 'Immediate',
+               f"Cut electricity use by {self.EFFICIENCY_SAVING_SHARE:.0%} "
+               f"({electricity * self.EFFICIENCY_SAVING_SHARE:.1f} kWh/day) with LEDs and efficient settings",
+               electricity * self.EFFICIENCY_SAVING_SHARE * grid_intensity)
+        yield ('energy', 'Medium', 'Short-term',
+               "Switch to a 100% renewable electricity tariff",
+               electricity * grid_intensity)
+
+    def generate(self, user_data: Dict[str, float], region: Optional[str] = None,
+                 grid_intensity: Optional[float] = None) -> List[Dict]:
+        """
+        Return recommendations with daily and yearly savings in kg CO2, largest first.
+        user_data must already be validated (numeric, non-negative).
+        """
+        factors, _ = self.registry.factors_for(region)
+        if grid_intensity is None:
+            grid_intensity = factors['electricity']
+
+        recommendations = [
+            {
+                'category': category,
+                'action': action,
+                'effort': effort,
+                'timeframe': timeframe,
+                'daily_savings_kg': saving,
+                'yearly_savings_kg': saving * 365
+            }
+            for category, effort, timeframe, action, saving
+            in self._candidates(user_data, factors, grid_intensity)
+            if saving >= self.MIN_DAILY_SAVING
+        ]
+        recommendations.sort(key=lambda r: r['daily_savings_kg'], reverse=True)
+        return recommendations
+
+    def format(self, recommendations: List[Dict], total_emissions: Optional[float] = None,
+               limit: int = 5) -> str:
+        """Render recommendations as text for the terminal and Streamlit"""
+        text = "\n=== Your Top Carbon Savings ===\n"
+        if not recommendations:
+            return text + "\nYour footprint is already very low. Keep it up! 🌱\n"
+
+        for i, rec in enumerate(recommendations[:limit], 1):
+            share = ""
+            if total_emissions:
+                share = f", {rec['daily_savings_kg'] / total_emissions:.0%} of your footprint"
+            text += (
+                f"\n{i}. {CATEGORY_ICONS[rec['category']]} {rec['action']}\n"
+                f"   Saves {rec['daily_savings_kg']:.2f} kg CO2/day "
+                f"({rec['yearly_savings_kg']:.0f} kg/year{share})\n"
+                f"   Effort: {rec['effort']} | Timeframe: {rec['timeframe']}\n"
+            )
+        return text
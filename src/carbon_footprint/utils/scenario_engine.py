@@ -0,0 +1,113 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from .batch_calculator import ACTIVITY_COLUMNS
+from .factor_registry import get_factor_registry
+
+
+@dataclass
+class Substitution:
+    """
+    Move `amounts` units a day of one activity to another (e.g. car_km -> train_km).
+    target=None means the units are cut rather than replaced.
+    """
+    source: str
+    target: Optional[str]
+    amounts: Sequence[float]
+    effort_per_unit: float = 1.0
+    label: str = ''
+
+    @property
+    def name(self) -> str:
+        return self.label or f"{self.source} -> {self.target or 'cut'}"
+
+
+class ScenarioEngine:
+    """
+    Evaluates every combination of a grid of substitutions in one NumPy broadcast.
+    Each substitution is an axis; savings and effort are sums of per-axis terms,
+    so the full grid costs a handful of array operations regardless of size.
+    """
+    def __init__(self, registry=None):
+        self.registry = registry or get_factor_registry()
+
+    def _unit_factor(self, key: Optional[str], factors: Dict[str, float]) -> float:
+        return factors[ACTIVITY_COLUMNS[key]] if key else 0.0
+
+    def evaluate(self, base_profile: Dict[str, float], substitutions: List[Substitution],
+                 max_effort: Optional[float] = None, top_k: int = 10,
+                 rank_by: str = 'savings', region: Optional[str] = None,
+                 grid_intensity: Optional[float] = None) -> Dict:
+        """
+        Return the top_k feasible scenarios, ranked by daily savings ('savings') or
+        savings per unit of effort ('efficiency'). A scenario is feasible when it
+        doesn't move more of an activity than the base profile has and its effort
+        is within max_effort.
+        """
+        factors, _ = self.registry.factors_for(region)
+        if grid_intensity is not None:
+            factors = {**factors, 'electricity': grid_intensity}
+
+        base_emissions = sum(float(base_profile.get(key, 0.0)) * factors[factor]
+                             for key, factor in ACTIVITY_COLUMNS.items())
+
+        n = len(substitutions)
+        savings = np.zeros([1] * n)
+        effort = np.zeros([1] * n)
+        moved = {}
+        axes = []
+        for i, sub in enumerate(substitutions):
+            shape = [1] * n
+            shape[i] = -1
+            amounts = np.asarray(sub.amounts, dtype=float)
+            axes.append(amounts)
+            grid = amounts.reshape(shape)
+
+            per_unit = self._unit_factor(sub.source, factors) - self._unit_factor(sub.target, factors)
+            savings = savings + grid * per_unit
+            effort = effort + grid * sub.effort_per_unit
+            moved[sub.source] = moved.get(sub.source, 0.0) + grid
+
+        feasible = np.ones(savings.shape, dtype=bool)
+        for source, total in moved.items():
+            feasible &= np.broadcast_to(total, savings.shape) <= float(base_profile.get(source, 0.0)) + 1e-9
+        if max_effort is not None:
+            feasible &= effort <= max_effort
+
+        savings = np.broadcast_to(savings, feasible.shape)
+        effort = np.broadcast_to(effort, feasible.shape)
+        candidates = np.flatnonzero(feasible)
+
+        if rank_by == 'efficiency':
+            flat_effort = effort.ravel()[candidates]
+            score = np.divide(savings.ravel()[candidates], flat_effort,
+                              out=np.zeros(len(candidates)), where=flat_effort > 0)
+        else:
+            score = savings.ravel()[candidates]
+
+        k = min(top_k, len(candidates))
+        if k:
+            best = np.argpartition(-score, k - 1)[:k]
+            best = best[np.argsort(-score[best])]
+            top = candidates[best]
+        else:
+            top = np.array([], dtype=int)
+
+        scenarios = []
+        for flat_index in top:
+            position = np.unravel_index(flat_index, feasible.shape)
+            daily = float(savings[position])
+            scenarios.append({
+                'changes': {sub.name: float(axes[i][position[i]]) for i, sub in enumerate(substitutions)},
+                'daily_savings_kg': daily,
+                'yearly_savings_kg': daily * 365,
+                'effort': float(effort[position]),
+                'new_daily_emissions': base_emissions - daily
+            })
+
+        return {
+            'base_daily_emissions': base_emissions,
+            'evaluated': int(feasible.size),
+            'feasible': int(len(candidates)),
+            'scenarios': scenarios
+        }
@@ -0,0 +1,56 @@
+import pandas as pd
+from dateutil.tz import tzlocal
+
+# user_data timestamps are naive local wall-clock time (datetime.now());
+# the grid intensity series is stored as naive UTC
+LOCAL_TZ = tzlocal()
+
+
+def _parse_one(value):
+    try:
+        ts = pd.Timestamp(value)
+    except (ValueError, TypeError):
+        return pd.NaT
+    if ts is not pd.NaT and ts.tzinfo is not None:
+        ts = ts.tz_convert(LOCAL_TZ).tz_localize(None)
+    return ts
+
+
+def parse_local(values: pd.Series) -> pd.Series:
+    """
+    Parse timestamps in any mix of formats to naive local time. Values with a UTC
+    offset are converted; unparseable or missing values become NaT.
+    """
+    try:
+        parsed = pd.to_datetime(values, format='mixed', errors='coerce')
+    except ValueError:
+        # Offset-aware and naive values mixed in one column; parse each distinct value
+        lookup = {value: _parse_one(value) for value in pd.unique(values)}
+        return pd.to_datetime(values.map(lookup))
+    if parsed.dt.tz is not None:
+        parsed = parsed.dt.tz_convert(LOCAL_TZ).dt.tz_localize(None)
+    return parsed
+
+
+def to_utc(values: pd.Series) -> pd.Series:
+    """
+    Parse timestamps to naive UTC. Naive values are taken to be UTC already.
+    """
+    return pd.to_datetime(values, format='mixed', utc=True).dt.tz_localize(None)
+
+
+def local_to_utc(values: pd.Series) -> pd.Series:
+    """
+    Convert naive local timestamps to naive UTC. Wall-clock times that are ambiguous
+    at a DST change become NaT.
+    """
+    return (pd.to_datetime(values)
+            .dt.tz_localize(LOCAL_TZ, ambiguous='NaT', nonexistent='shift_forward')
+            .dt.tz_convert('UTC').dt.tz_localize(None))
+
+
+def utc_to_local(values: pd.Series) -> pd.Series:
+    """
+    Convert naive UTC timestamps to naive local time
+    """
+    return pd.to_datetime(values).dt.tz_localize('UTC').dt.tz_convert(LOCAL_TZ).dt.tz_localize(None)
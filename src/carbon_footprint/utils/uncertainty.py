@@ -0,0 +1,85 @@
+from typing import Dict, Optional, Sequence
+import numpy as np
+import pandas as pd
+from .batch_calculator import ACTIVITY_COLUMNS, CATEGORY_COLUMNS
+from ..config.settings import (
+    EMISSION_FACTOR_UNCERTAINTY, INPUT_UNCERTAINTY, UNCERTAINTY_DRAWS, UNCERTAINTY_SEED
+)
+
+INPUT_KEYS = list(ACTIVITY_COLUMNS)
+CATEGORIES = list(CATEGORY_COLUMNS)
+
+
+class UncertaintyEstimator:
+    """
+    Monte Carlo percentile bands for footprint estimates.
+
+    Factors get mean-preserving lognormal noise (EMISSION_FACTOR_UNCERTAINTY) and
+    inputs get truncated normal noise (INPUT_UNCERTAINTY). Both are multiplicative,
+    so the combined multipliers are drawn once at construction with a seeded RNG
+    and each estimate is a single matrix product plus a partial sort.
+    """
+    def __init__(self, draws: int = UNCERTAINTY_DRAWS, seed: int = UNCERTAINTY_SEED,
+                 percentiles: Sequence[float] = (5, 50, 95)):
+        self.percentiles = list(percentiles)
+        # Nearest-rank positions, so bands come from one np.partition instead of a full percentile
+        self.ranks = [int(round(p / 100 * (draws - 1))) for p in self.percentiles]
+        rng = np.random.default_rng(seed)
+
+        sigma = np.array([[EMISSION_FACTOR_UNCERTAINTY[ACTIVITY_COLUMNS[key]]] for key in INPUT_KEYS])
+        factor_noise = rng.lognormal(mean=-sigma ** 2 / 2, sigma=sigma, size=(len(INPUT_KEYS), draws))
+        input_noise = np.clip(rng.normal(1.0, INPUT_UNCERTAINTY, size=(len(INPUT_KEYS), draws)), 0.0, None)
+        # (inputs, draws)
+        self.multipliers = factor_noise * input_noise
+
+        # (inputs, outputs) 0/1 matrix summing per-input contributions into each category and the total
+        self.output_matrix = np.array([
+            [key in CATEGORY_COLUMNS[category] for category in CATEGORIES] + [True] for key in INPUT_KEYS
+        ], dtype=float)
+        self.outputs = CATEGORIES + ['total']
+
+    def _bands(self, samples: np.ndarray) -> np.ndarray:
+        """(rows, draws) samples -> (rows, percentiles) band values"""
+        return np.partition(samples, self.ranks, axis=1)[:, self.ranks]
+
+    def estimate(self, valid_data: Dict[str, float], factors: Dict[str, float],
+                 grid_intensity: Optional[float] = None) -> Dict[str, Dict[str, float]]:
+        """
+        Percentile bands for each category, the daily total and the yearly total
+        """
+        point = np.array([
+            valid_data.get(key, 0.0) * (grid_intensity if key == 'electricity' and grid_intensity is not None
+                                        else factors[ACTIVITY_COLUMNS[key]])
+            for key in INPUT_KEYS
+        ])
+        # (outputs, draws) in one matrix product
+        samples = (point[:, None] * self.output_matrix).T @ self.multipliers
+        values = self._bands(samples)
+
+        bands = {
+            name: {f"p{p:g}": float(v) for p, v in zip(self.percentiles, row)}
+            for name, row in zip(self.outputs, values)
+        }
+        bands['yearly_total'] = {k: v * 365 for k, v in bands['total'].items()}
+        return bands
+
+    def estimate_batch(self, valid_df: pd.DataFrame, factors: np.ndarray,
+                       chunk_size: int = 20) -> pd.DataFrame:
+        """
+        Bands for many users. valid_df holds validated inputs; factors is a
+        (len(valid_df), 7) matrix in FACTOR_KEYS order, e.g. from the factor
+        registry's lookup(). Users are processed in chunks to bound memory.
+        """
+        point = valid_df[INPUT_KEYS].to_numpy(dtype=float) * np.atleast_2d(factors)
+        n_outputs = len(self.outputs)
+        parts = []
+        for start in range(0, len(point), chunk_size):
+            chunk = point[start:start + chunk_size]
+            # (users * outputs, inputs) weights -> (users * outputs, draws) samples
+            weights = (chunk[:, :, None] * self.output_matrix[None, :, :]).transpose(0, 2, 1)
+            samples = weights.reshape(-1, len(INPUT_KEYS)) @ self.multipliers
+            parts.append(self._bands(samples).reshape(len(chunk), n_outputs * len(self.percentiles)))
+
+        columns = [f"{name}_p{p:g}" for name in self.outputs for p in self.percentiles]
+        values = np.vstack(parts) if parts else np.empty((0, len(columns)))
+        return pd.DataFrame(values, columns=columns, index=valid_df.index)
@@ -2,7 +2,14 @@ import matplotlib.pyplot as plt
 import pandas as pd
 from datetime import datetime
 import seaborn as sns
+import numpy as np
 import os
+import threading
+
+VEGA_LITE_SCHEMA = 'https://vega.github.io/schema/vega-lite/v5.json'
+
+# pyplot keeps global figure state, so PNG rendering from worker threads must be serialised
+RENDER_LOCK = threading.Lock()
 
 class EmissionsVisualizer:
     def __init__(self):
@@ -42,28 +49,113 @@ class EmissionsVisualizer:
         plt.close()
         return file_path
 
-    def create_comparison_chart(self, total_emissions, regional_data=None):
+    def _comparison_data(self, total_emissions, regional_data=None, cohort=None):
+        """Labels and values for the comparison chart; averages we have no data for are left out"""
+        regional_data = regional_data or {}
+        data = [total_emissions]
+        labels = ['Your Emissions']
+        
+        if cohort:
+            data.append(cohort['cohort_median'])
+            labels.append('Peer Cohort Median')
+        
+        if regional_data.get('source') == 'epa_facilities':
+            # Industrial emissions per resident, not a personal footprint average
+            names = (('average_emissions', 'State Facility Emissions per Resident'),
+                     ('national_average', 'US Facility Emissions per Resident'))
+        else:
+            names = (('average_emissions', 'Regional Average'), ('national_average', 'National Average'))
+        for key, label in names:
+            if regional_data.get(key) is not None:
+                data.append(regional_data[key])
+                labels.append(label)
+        
+        return labels, data
+
+    def create_comparison_chart(self, total_emissions, regional_data=None, cohort=None):
         """
         Create bar chart comparing user's emissions to real-time averages
+        and, when a cohort comparison is available, to their peer cohort
         """
         plt.figure(figsize=(10, 6))
-        
-        # Get real-time regional emissions data if available
-        if regional_data:
-            regional_average = regional_data.get('average_emissions', 12)  # Default fallback
-            national_average = regional_data.get('national_average', 10)   # Default fallback
-        else:
-            regional_average = 12  # Default fallback
-            national_average = 10  # Default fallback
-        
-        data = [total_emissions, regional_average, national_average]
-        labels = ['Your Emissions', 'Regional Average', 'National Average']
+        labels, data = self._comparison_data(total_emissions, regional_data, cohort)
         
         plt.bar(labels, data)
         plt.title('Your Emissions Compared to Real-Time Averages')
         plt.ylabel('Daily Emissions (kg CO2)')
+        if cohort:
+            plt.figtext(0.5, 0.01, f"You emit more than {cohort['cohort_percentile']}% of your peer cohort",
+                        ha='center')
         
         file_path = os.path.join(self.output_dir, 'comparison_chart.png')
         plt.savefig(file_path)
         plt.close()
-        return file_path 
\ No newline at end of file
+        return file_path
+
+    # JSON (Vega-Lite) specs: a few hundred bytes each, rendered by the client
+    # with vega-embed or st.vega_lite_chart instead of matplotlib on the server
+
+    def emissions_breakdown_spec(self, transport, energy, diet):
+        """Vega-Lite pie chart spec of the emissions breakdown"""
+        return {
+            '$schema': VEGA_LITE_SCHEMA,
+            'title': 'Carbon Emissions Breakdown',
+            'data': {'values': [
+                {'category': label, 'emissions': round(float(value), 3)}
+                for label, value in zip(['Transport', 'Energy', 'Diet'], [transport, energy, diet])
+            ]},
+            'mark': {'type': 'arc', 'tooltip': True},
+            'encoding': {
+                'theta': {'field': 'emissions', 'type': 'quantitative'},
+                'color': {'field': 'category', 'type': 'nominal',
+                          'scale': {'range': self.colors}}
+            }
+        }
+
+    def historical_trends_spec(self, df, max_points=200):
+        """
+        Vega-Lite line chart spec of historical emissions, averaged into at most
+        max_points buckets so the payload stays small for long histories
+        """
+        totals = df['total_emissions'].to_numpy(dtype=float)
+        entries = np.arange(len(totals))
+        if len(totals) > max_points:
+            buckets = entries * max_points // len(totals)
+            counts = np.bincount(buckets)
+            entries = np.bincount(buckets, weights=entries) / counts
+            totals = np.bincount(buckets, weights=totals) / counts
+
+        return {
+            '$schema': VEGA_LITE_SCHEMA,
+            'title': 'Historical Emissions Trends',
+            'data': {'values': [
+                {'entry': round(float(x), 1), 'total_emissions': round(float(y), 3)}
+                for x, y in zip(entries, totals)
+            ]},
+            'mark': {'type': 'line', 'tooltip': True},
+            'encoding': {
+                'x': {'field': 'entry', 'type': 'quantitative', 'title': 'Entry'},
+                'y': {'field': 'total_emissions', 'type': 'quantitative',
+                      'title': 'Total Emissions (kg CO2)'}
+            }
+        }
+
+    def comparison_chart_spec(self, total_emissions, regional_data=None, cohort=None):
+        """Vega-Lite bar chart spec comparing the user's emissions to averages"""
+        labels, data = self._comparison_data(total_emissions, regional_data, cohort)
+        spec = {
+            '$schema': VEGA_LITE_SCHEMA,
+            'title': 'Your Emissions Compared to Real-Time Averages',
+            'data': {'values': [
+                {'label': label, 'emissions': round(float(value), 3)}
+                for label, value in zip(labels, data)
+            ]},
+            'mark': {'type': 'bar', 'tooltip': True},
+            'encoding': {
+                'x': {'field': 'label', 'type': 'nominal', 'sort': None, 'title': None},
+                'y': {'field': 'emissions', 'type': 'quantitative', 'title': 'Daily Emissions (kg CO2)'}
+            }
+        }
+        if cohort:
+            spec['description'] = f"You emit more than {cohort['cohort_percentile']}% of your peer cohort"
+        return spec
@@ -0,0 +1,36 @@
+import os
+import sys
+import tempfile
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+# Settings are read at import time; keep trained models out of the source tree
+os.environ.setdefault('COHORT_MODEL_PATH', os.path.join(tempfile.mkdtemp(), 'cohort_model.pkl'))
+
+from carbon_footprint.data import database  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """
+    An initialized Database in a temporary file
+    """
+    monkeypatch.setattr(database, 'DATABASE_PATH', str(tmp_path / 'carbon_footprint.db'))
+    db = database.Database()
+    db.initialize_database()
+    return db
+
+
+def insert_rows(db, rows):
+    """
+    Insert user_data rows given as dicts of column values
+    """
+    with db.get_connection() as conn:
+        for row in rows:
+            conn.execute(
+                f"INSERT INTO user_data ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                list(row.values())
+            )
+        conn.commit()
@@ -0,0 +1,20 @@
+from carbon_footprint.utils.answer_index import AnswerIndex
+
+
+def make_index(tmp_path):
+    return AnswerIndex(approved_path=str(tmp_path / 'approved_answers.json'))
+
+
+def test_bank_probes(tmp_path):
+    # Curated phrasings and paraphrases hit their answers; out-of-bank questions miss
+    assert make_index(tmp_path).check() == []
+
+
+def test_repeat_question_is_answered_locally(tmp_path):
+    match = make_index(tmp_path).lookup('how do I reduce my footprint')
+    assert match is not None and match['id'] == 'reduce-footprint'
+
+
+def test_answers_quote_registry_factors(tmp_path):
+    answer = make_index(tmp_path).lookup('Train vs car emissions')['answer']
+    assert '{' not in answer and '0.041' in answer
@@ -0,0 +1,40 @@
+from concurrent.futures import ThreadPoolExecutor
+from carbon_footprint.bot.carbon_bot import CarbonFootprintBot
+from carbon_footprint.data.database import DataValidator
+from carbon_footprint.utils.recommendation_engine import RecommendationEngine
+
+DRIVER = {'car_km': 60, 'bus_km': 0, 'train_km': 0, 'electricity': 5,
+          'meat_meals': 0, 'veg_meals': 2, 'vegan_meals': 1}
+MEAT_EATER = {'car_km': 0, 'bus_km': 0, 'train_km': 0, 'electricity': 5,
+              'meat_meals': 3, 'veg_meals': 0, 'vegan_meals': 0}
+
+
+def make_bot():
+    # Only the parts get_recommendations and the insights stage use
+    bot = CarbonFootprintBot.__new__(CarbonFootprintBot)
+    bot.validator = DataValidator()
+    bot.recommendation_engine = RecommendationEngine()
+    bot.executor = ThreadPoolExecutor(max_workers=1)
+    return bot
+
+
+def test_recommendations_use_the_request_input_not_last_input():
+    bot = make_bot()
+    emissions = {'total': 10.0, 'grid_intensity': 0.233}
+    driver = bot.validator.validate_input(DRIVER)
+
+    bot.last_input, bot.user_region = dict(MEAT_EATER), 'NY'  # set by another request
+    explicit = bot.get_recommendations(emissions, driver, 'CA')
+
+    bot.last_input, bot.user_region = dict(DRIVER), 'CA'
+    assert explicit == bot.get_recommendations(emissions)
+
+
+def test_ai_insights_future_belongs_to_the_caller():
+    bot = make_bot()
+    bot.insights_engine = type('Echo', (), {'generate_ai_insights': staticmethod(lambda data: data['car_km'])})()
+    first = bot.start_ai_insights(DRIVER, {'total': 1.0})
+    second = bot.start_ai_insights(MEAT_EATER, {'total': 2.0})
+    assert bot.get_ai_insights(first, timeout=5) == 60
+    assert bot.get_ai_insights(second, timeout=5) == 0
+    assert not hasattr(bot, 'pending_insights')
@@ -0,0 +1,52 @@
+import numpy as np
+from carbon_footprint.models.cohort_model import PeerCohortModel, FEATURES
+from conftest import insert_rows
+
+
+def activity_rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(n):
+        row = {feature: float(rng.uniform(0, 20)) for feature in FEATURES}
+        row.update(timestamp=f'2025-01-{i % 28 + 1:02d} 12:00:00', region='CA' if i % 2 else 'NY',
+                   total_emissions=float(rng.uniform(1, 40)))
+        rows.append(row)
+    return rows
+
+
+def test_trains_with_empty_summary_table(db):
+    insert_rows(db, activity_rows(50))
+    model = PeerCohortModel()
+    with db.get_connection() as conn:
+        assert model.train(conn, chunk_size=16)
+    assert model.cohort_sizes.sum() == 50
+    assert set(model.region_means) == {'CA', 'NY'}
+
+
+def test_trains_with_empty_raw_table(db):
+    with db.get_connection() as conn:
+        conn.executemany(
+            f"INSERT INTO user_data_summary (day, region, row_count, {', '.join(FEATURES)}, total_emissions) "
+            f"VALUES (?, ?, ?, {', '.join('?' * len(FEATURES))}, ?)",
+            [(f'2024-01-{day:02d}', 'CA', 4, *[4.0 * day] * len(FEATURES), 40.0 * day) for day in range(1, 11)]
+        )
+        conn.commit()
+        model = PeerCohortModel()
+        assert model.train(conn)
+    assert model.cohort_sizes.sum() == 40
+    assert abs(model.population_mean - 55.0) < 1e-9
+
+
+def test_too_little_data_returns_false(db):
+    with db.get_connection() as conn:
+        assert not PeerCohortModel().train(conn)
+
+
+def test_percentiles_match_exact_within_a_bin(db):
+    rows = activity_rows(400, seed=1)
+    insert_rows(db, rows)
+    model = PeerCohortModel()
+    with db.get_connection() as conn:
+        model.train(conn, chunk_size=64)
+    exact = np.percentile([row['total_emissions'] for row in rows], np.arange(101))
+    assert np.abs(model.population_percentiles - exact).max() < 0.5
@@ -0,0 +1,46 @@
+import json
+import numpy as np
+import pytest
+from carbon_footprint.utils.factor_registry import EmissionFactorRegistry, FACTOR_KEYS
+
+
+@pytest.fixture
+def registry(tmp_path):
+    path = tmp_path / 'emission_factors.json'
+    path.write_text(json.dumps({'factor_sets': [
+        {'version': 'base-2023', 'region': 'default', 'effective_date': '2023-01-01',
+         'factors': {'car': 0.12, 'meat': 2.5}},
+        {'version': 'base-2025', 'region': 'default', 'effective_date': '2025-01-01',
+         'factors': {'car': 0.2, 'meat': 2.5}},
+        {'version': 'ca-2024.1', 'region': 'CA', 'effective_date': '2024-03-10',
+         'factors': {'meat': 3.0}}
+    ]}))
+    return EmissionFactorRegistry(str(path))
+
+
+def test_region_set_does_not_apply_before_its_effective_date(registry):
+    factors, version = registry.factors_for('CA', '2024-03-02')
+    assert version == 'base-2023'
+    assert factors['meat'] == 2.5
+
+    factors, version = registry.factors_for('CA', '2024-03-10')
+    assert version == 'ca-2024.1+base-2023'
+    assert factors['meat'] == 3.0
+
+
+def test_region_set_inherits_default_revision(registry):
+    factors, version = registry.factors_for('CA', '2025-06-01')
+    assert version == 'ca-2024.1+base-2025'
+    assert factors['car'] == 0.2
+    assert factors['meat'] == 3.0
+    assert registry.factors_by_version(version) == factors
+
+
+def test_vectorized_lookup_matches_factors_for(registry):
+    timestamps = ['2024-03-02', '2024-03-10', '2025-06-01', '2025-06-01']
+    regions = ['CA', 'CA', 'CA', None]
+    factors, versions = registry.lookup(timestamps, regions)
+    for row, (when, region) in enumerate(zip(timestamps, regions)):
+        expected, version = registry.factors_for(region, when)
+        assert versions[row] == version
+        assert np.allclose(factors[row], [expected[key] for key in FACTOR_KEYS])
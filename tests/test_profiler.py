@@ -0,0 +1,31 @@
+import os
+import tracemalloc
+from carbon_footprint.utils.profiler import Profiler
+
+
+def make_profiler(tmp_path, **kwargs):
+    return Profiler(enabled=True, sample_rate=1.0, output_dir=str(tmp_path), **kwargs)
+
+
+def test_traces_one_frame_by_default(tmp_path):
+    profiler = make_profiler(tmp_path)
+    with profiler.profile('region'):
+        assert tracemalloc.get_traceback_limit() == 1
+    assert not tracemalloc.is_tracing()
+    assert any(name.endswith('.alloc.txt') for name in os.listdir(tmp_path))
+
+
+def test_zero_frames_skips_allocation_capture(tmp_path):
+    profiler = make_profiler(tmp_path, mode='cprofile', tracemalloc_frames=0)
+    with profiler.profile('region'):
+        assert not tracemalloc.is_tracing()
+    names = os.listdir(tmp_path)
+    assert any(name.endswith('.prof') for name in names)
+    assert not any(name.endswith('.alloc.txt') for name in names)
+
+
+def test_teardown_errors_do_not_fail_the_call(tmp_path):
+    profiler = make_profiler(tmp_path)
+    with profiler.profile('region'):
+        tracemalloc.stop()
+    assert profiler._active.acquire(blocking=False)
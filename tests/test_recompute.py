@@ -0,0 +1,43 @@
+import sys
+from carbon_footprint import main as cli
+from carbon_footprint.data.recompute import EmissionsRecomputer
+from conftest import insert_rows
+
+
+def stale_rows(n):
+    return [{'timestamp': f'2025-02-{i % 28 + 1:02d} 08:00:00', 'car_km': 10.0, 'meat_meals': 1.0,
+             'total_emissions': 0.0, 'factor_version': 'retired', 'region': 'CA'} for i in range(n)]
+
+
+def progress_rows(db):
+    with db.get_connection() as conn:
+        return (conn.execute('SELECT COUNT(*) FROM recompute_jobs').fetchone()[0]
+                + conn.execute('SELECT COUNT(*) FROM recompute_chunks').fetchone()[0])
+
+
+def test_recompute_cli_finishes_job(db, monkeypatch):
+    # An empty user_data_summary used to crash the cohort refresher before the job was cleared
+    insert_rows(db, stale_rows(30))
+    monkeypatch.setattr(sys, 'argv', ['run.py', '--mode', 'recompute', '--chunk-size', '8'])
+    cli.main()
+
+    with db.get_connection() as conn:
+        versions = {row[0] for row in conn.execute('SELECT DISTINCT factor_version FROM user_data')}
+        totals = [row[0] for row in conn.execute('SELECT total_emissions FROM user_data')]
+    assert 'retired' not in versions
+    assert all(total > 0 for total in totals)
+    assert progress_rows(db) == 0
+
+
+def test_failing_refresher_does_not_block_others(db, capsys):
+    insert_rows(db, stale_rows(5))
+    ran = []
+
+    def broken(conn):
+        raise ValueError('boom')
+
+    recomputer = EmissionsRecomputer(refreshers=[broken, lambda conn: ran.append(True)], db=db)
+    assert recomputer.run() == 5
+    assert ran == [True]
+    assert 'boom' in capsys.readouterr().out
+    assert progress_rows(db) == 0